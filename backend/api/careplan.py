@@ -0,0 +1,445 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from database import db, FORM_MODELS
+from api.utils import append_item, insert_records, is_missing_user, json_records, remove_item, replace_item, update_record
+from response_cache import invalidate
+from serializers import serialize, serializer
+from validators import SERVER_COLUMNS, is_json_array, validate
+from sqlalchemy import ARRAY, Text, func, literal, select, text, true, union_all
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from datetime import datetime, timezone
+
+careplan_bp = Blueprint('careplan', __name__)
+
+# Rows fetched per round trip from the server-side cursor while exporting
+EXPORT_BATCH_SIZE = 500
+
+BULK_ADD_MAX_RECORDS = 500
+
+FORMS = { model.__table__.name: model for model in FORM_MODELS }
+
+# Names of the columns a client can write for each form
+FORM_COLUMNS = { model: { column.name for column in model.__table__.columns } - SERVER_COLUMNS for model in FORM_MODELS }
+
+# Names of each form's list-valued (ARRAY) columns, whose items can be appended, replaced and removed one at a time
+ARRAY_COLUMNS = { model: { column.name for column in model.__table__.columns if isinstance(column.type, ARRAY) } for model in FORM_MODELS }
+
+def form_records(model, user_id):
+    """
+    Scalar subquery aggregating every record of one form for the user into a JSON array, oldest first. Values are
+    formatted with json_value(), so dates match the get_<form> endpoints.
+    """
+    table = model.__table__
+    rows = select(*table.columns).where(table.c.user_id == user_id).subquery()
+    formatted, record = json_records(rows, table)
+    records = func.json_agg(aggregate_order_by(record, rows.c.date_created))
+
+    return select(func.coalesce(records, text("'[]'::json"))).select_from(rows).join(formatted, true()).scalar_subquery()
+
+@careplan_bp.route('/get_careplan', methods=['GET'])
+@jwt_required()
+def get_careplan():
+    """
+    Gets the user's whole Plan of Safe Care: every record of every form, in a single SQL statement.
+
+    The JSON document is built by Postgres with one json_agg subquery per form table and sent as is. Dates and
+    timestamps are formatted in SQL as the RFC 822 strings the get_<form> endpoints return.
+
+    Returns:
+        - If successful, returns { <form>: [records] } with a key for each of the ten forms.
+        - If there is an error processing the request, returns error code 500.
+    """
+    user_id = get_jwt_identity()
+
+    try:
+        pairs = []
+        for model in FORM_MODELS:
+            pairs += [literal(model.__table__.name), form_records(model, user_id)]
+
+        careplan = db.session.execute(select(func.json_build_object(*pairs).cast(Text))).scalar_one()
+
+    except Exception as e:
+        return jsonify(f"Error processing request: {e}"), 500
+
+    return Response(careplan, status=200, mimetype='application/json')
+
+@careplan_bp.route('/get_careplan_summary', methods=['GET'])
+@jwt_required()
+def get_careplan_summary():
+    """
+    Gets how many submissions the user has for each form and when each form was last modified.
+
+    Runs one UNION ALL of count/max aggregates over the ten form tables. Both columns are in the
+    (user_id, date_last_modified) indexes, so each branch can be answered with an index-only scan.
+
+    Returns:
+        - If successful, returns { <form>: { count, last_modified } } for each of the ten forms.
+        - If there is an error processing the request, returns error code 500.
+    """
+    user_id = get_jwt_identity()
+
+    try:
+        statement = union_all(*[
+            select(
+                literal(model.__table__.name).label('form'),
+                func.count().label('count'),
+                func.max(model.date_last_modified).label('last_modified')
+            ).where(model.user_id == user_id)
+            for model in FORM_MODELS
+        ])
+
+        rows = db.session.execute(statement).all()
+
+    except Exception as e:
+        return jsonify(f"Error processing request: {e}"), 500
+
+    return jsonify({ row.form: { 'count': row.count, 'last_modified': row.last_modified } for row in rows }), 200
+
+def export_lines(user_id):
+    """
+    Yields the user's records as NDJSON, one form table at a time, oldest first within each form.
+
+    Each line is built by Postgres and read from a server-side cursor EXPORT_BATCH_SIZE rows at a time, so only one
+    batch is held in memory however many records the user has.
+    """
+    for model in FORM_MODELS:
+        table = model.__table__
+        line = func.json_build_object(
+            literal('form'), literal(table.name),
+            literal('record'), func.row_to_json(table.table_valued())
+        ).cast(Text)
+        statement = select(line).where(table.c.user_id == user_id).order_by(table.c.date_created)
+
+        result = db.session.execute(statement, execution_options={'yield_per': EXPORT_BATCH_SIZE})
+        for lines in result.scalars().partitions():
+            yield '\n'.join(lines) + '\n'
+
+@careplan_bp.route('/export_careplan', methods=['GET'])
+@jwt_required()
+def export_careplan():
+    """
+    Streams every record of every form for the user as NDJSON, one { form, record } object per line.
+
+    Unlike the other endpoints, dates and timestamps are ISO 8601 strings: the export is what `flask careplan import`
+    reads back, and RFC 822 would drop the timestamps' microseconds.
+
+    Returns:
+        - If successful, streams the user's records with the application/x-ndjson mimetype.
+    """
+    user_id = get_jwt_identity()
+
+    return Response(stream_with_context(export_lines(user_id)), status=200, mimetype='application/x-ndjson')
+
+def column_default(column):
+    """
+    The Python-side default of a column, or None. Callable defaults such as lambda: [] are called for a fresh value.
+    """
+    default = column.default
+
+    if default is None:
+        return None
+
+    return default.arg(None) if default.is_callable else default.arg
+
+def form_values(model, record):
+    """
+    Validates a submitted record and picks its form columns, the way the add_<form> handlers read them with data.get().
+
+    Columns left out or null that have a default get it, as insert_record lets the default apply for add_<form>.
+    insert_records sends every row with the same columns, so the default has to be filled in here.
+
+    Returns:
+        - The column values and None.
+        - None and an error message if the record isn't an object or fails validation.
+    """
+    errors = validate(model, record)
+
+    if errors:
+        return None, '; '.join(errors)
+
+    values = {}
+    for column in model.__table__.columns:
+        if column.name not in SERVER_COLUMNS:
+            value = record.get(column.name)
+            values[column.name] = column_default(column) if value is None else value
+
+    return values, None
+
+def insert_each(model, rows, indexes, errors):
+    """
+    Inserts rows one at a time, each in its own savepoint, recording the rows Postgres rejects in errors instead of
+    aborting the batch. Used only when the single multi-row INSERT of a partial bulk add failed.
+    """
+    inserted = []
+
+    for index, row in zip(indexes, rows):
+        try:
+            with db.session.begin_nested():
+                inserted += insert_records(model, [row])
+        except DBAPIError as e:
+            if is_missing_user(e):
+                raise
+            errors.append({ 'index': index, 'error': str(e.orig).splitlines()[0] })
+
+    return inserted
+
+@careplan_bp.route('/bulk_add_<form>', methods=['POST'])
+@jwt_required()
+def bulk_add(form):
+    """
+    Adds many records of one form for the user in a single transaction and a single multi-row INSERT.
+
+    Request JSON Parameters:
+        - An array of up to BULK_ADD_MAX_RECORDS records, each with the fields of the matching add_<form> endpoint.
+
+    Query Parameters:
+        - partial (str) (optional): 'true' inserts the valid records and reports the rest in errors. Otherwise any
+          invalid record fails the whole batch and nothing is inserted.
+
+    Returns:
+        - If successful, returns { records, errors } where errors lists the { index, error } of each rejected record.
+        - If the form doesn't exist or the user doesn't exist, returns error code 404.
+        - If the body isn't an array of records or no record could be inserted, returns error code 400.
+        - If there is an error processing the request, returns error code 500.
+    """
+    model = FORMS.get(form)
+    if not model:
+        return jsonify("Form not found."), 404
+
+    records = request.get_json()
+    if not isinstance(records, list) or not records:
+        return jsonify("Request body must be a non-empty array of records."), 400
+
+    if len(records) > BULK_ADD_MAX_RECORDS:
+        return jsonify(f"At most {BULK_ADD_MAX_RECORDS} records can be added at once."), 400
+
+    user_id = get_jwt_identity()
+    partial = request.args.get('partial') == 'true'
+    now = datetime.now(timezone.utc)
+
+    rows, indexes, errors = [], [], []
+    for index, record in enumerate(records):
+        values, error = form_values(model, record)
+
+        if error:
+            errors.append({ 'index': index, 'error': error })
+            continue
+
+        rows.append({ **values, 'user_id': user_id, 'date_created': now, 'date_last_modified': now })
+        indexes.append(index)
+
+    if errors and not partial:
+        return jsonify({ 'records': [], 'errors': errors }), 400
+
+    try:
+        if partial:
+            try:
+                with db.session.begin_nested():
+                    inserted = insert_records(model, rows)
+            except DBAPIError as e:
+                if is_missing_user(e):
+                    raise
+                inserted = insert_each(model, rows, indexes, errors)
+        else:
+            inserted = insert_records(model, rows)
+
+        db.session.commit()
+        invalidate(user_id, model)
+
+    except IntegrityError as e:
+        if is_missing_user(e):
+            return jsonify("User not found."), 404
+        return jsonify(f"Error processing request: {e}"), 500
+    except Exception as e:
+        return jsonify(f"Error processing request: {e}"), 500
+
+    errors.sort(key=lambda error: error['index'])
+    status = 201 if inserted else 400
+
+    return jsonify({ 'records': serializer(model).many(inserted), 'errors': errors }), status
+
+@careplan_bp.route('/<form>/<id>', methods=['PATCH'])
+@careplan_bp.route('/update_<form>/<id>', methods=['PATCH'])
+@jwt_required()
+def patch_record(form, id):
+    """
+    Updates only the supplied fields of one of the user's form records.
+
+    The UPDATE sets the columns present in the request and date_last_modified, every other column is left out of the
+    statement. Postgres then keeps the unchanged JSONB values as they are instead of rewriting and re-TOASTing them,
+    which the update_<form> handlers do for every column on each save.
+
+    Request JSON Parameters:
+        - Any of the fields of the matching add_<form> endpoint. Fields left out keep their stored value.
+
+    Returns:
+        - If successful, returns the whole updated record.
+        - If the form doesn't exist, returns error code 404.
+        - If no form field was supplied or the user has no record with this id, returns error code 400.
+        - If a field has the wrong type or a required field is set to null, returns error code 422.
+        - If there is an error processing the request, returns error code 500.
+    """
+    model = FORMS.get(form)
+    if not model:
+        return jsonify("Form not found."), 404
+
+    data = request.get_json()
+
+    errors = validate(model, data, defaults=False, partial=True)
+    if errors:
+        return jsonify(f"Invalid {form}: {'; '.join(errors)}"), 422
+
+    columns = FORM_COLUMNS[model]
+    values = { name: value for name, value in data.items() if name in columns }
+
+    if not values:
+        return jsonify("No fields to update."), 400
+
+    user_id = get_jwt_identity()
+
+    try:
+        record = update_record(model, user_id, id, **values, date_last_modified=datetime.now(timezone.utc))
+
+        if not record:
+            return jsonify(f"{form} record for this user does not exist."), 400
+
+        db.session.commit()
+        invalidate(user_id, model)
+
+    except Exception as e:
+        return jsonify(f"Error processing request: {e}"), 500
+
+    return jsonify(serialize(model, record)), 200
+
+def array_column(form, name):
+    """
+    Looks up the model of a form and checks that name is one of its ARRAY columns.
+
+    Returns:
+        - The model and None.
+        - None and the 404 response if the form or the column doesn't exist.
+    """
+    model = FORMS.get(form)
+    if not model:
+        return None, (jsonify("Form not found."), 404)
+
+    if name not in ARRAY_COLUMNS[model]:
+        return None, (jsonify(f"{form} has no list field {name}."), 404)
+
+    return model, None
+
+def item_response(model, user_id, row, status, **body):
+    """
+    Commits an item update and returns its result. Invalidation and the response are the same for every item route.
+    """
+    db.session.commit()
+    invalidate(user_id, model)
+
+    return jsonify({ **body, 'length': row.length, 'date_last_modified': row.date_last_modified }), status
+
+@careplan_bp.route('/<form>/<id>/<field>', methods=['POST'])
+@jwt_required()
+def append_record_item(form, id, field):
+    """
+    Appends one item to a list field (an ARRAY column such as tests, current_medication_list, safe_caregivers or
+    people_living_in_home) of one of the user's form records.
+
+    The item is added with array_append in a single UPDATE, so the request carries only the new item instead of the
+    whole list, and the list is never read back into the application.
+
+    Request JSON Parameters:
+        - The item, a JSON object shaped like the field's other items.
+
+    Returns:
+        - If successful, returns { index, item, length, date_last_modified } with the new item's 0-based index.
+        - If the form, the field or the user's record doesn't exist, returns error code 404.
+        - If the item isn't a JSON object, returns error code 422.
+        - If there is an error processing the request, returns error code 500.
+    """
+    model, error = array_column(form, field)
+    if error:
+        return error
+
+    item = request.get_json()
+    if not is_json_array([item]):
+        return jsonify("Item must be a JSON object."), 422
+
+    user_id = get_jwt_identity()
+
+    try:
+        row = append_item(model, user_id, id, field, item)
+
+        if not row:
+            return jsonify(f"{form} record for this user does not exist."), 404
+
+        return item_response(model, user_id, row, 201, index=row.length - 1, item=item)
+
+    except Exception as e:
+        return jsonify(f"Error processing request: {e}"), 500
+
+@careplan_bp.route('/<form>/<id>/<field>/<int:index>', methods=['PUT'])
+@jwt_required()
+def replace_record_item(form, id, field, index):
+    """
+    Replaces the item at a 0-based index of a list field of one of the user's form records, in a single UPDATE that
+    assigns only that array element.
+
+    Request JSON Parameters:
+        - The new item, a JSON object.
+
+    Returns:
+        - If successful, returns { index, item, length, date_last_modified }.
+        - If the form, the field, the user's record or the item doesn't exist, returns error code 404.
+        - If the item isn't a JSON object, returns error code 422.
+        - If there is an error processing the request, returns error code 500.
+    """
+    model, error = array_column(form, field)
+    if error:
+        return error
+
+    item = request.get_json()
+    if not is_json_array([item]):
+        return jsonify("Item must be a JSON object."), 422
+
+    user_id = get_jwt_identity()
+
+    try:
+        row = replace_item(model, user_id, id, field, index, item)
+
+        if not row:
+            return jsonify(f"{form} record for this user has no {field} item {index}."), 404
+
+        return item_response(model, user_id, row, 200, index=index, item=item)
+
+    except Exception as e:
+        return jsonify(f"Error processing request: {e}"), 500
+
+@careplan_bp.route('/<form>/<id>/<field>/<int:index>', methods=['DELETE'])
+@jwt_required()
+def remove_record_item(form, id, field, index):
+    """
+    Removes the item at a 0-based index of a list field of one of the user's form records, in a single UPDATE that
+    joins the slices of the array on either side of it. Later items move down by one.
+
+    Returns:
+        - If successful, returns { index, length, date_last_modified }.
+        - If the form, the field, the user's record or the item doesn't exist, returns error code 404.
+        - If there is an error processing the request, returns error code 500.
+    """
+    model, error = array_column(form, field)
+    if error:
+        return error
+
+    user_id = get_jwt_identity()
+
+    try:
+        row = remove_item(model, user_id, id, field, index)
+
+        if not row:
+            return jsonify(f"{form} record for this user has no {field} item {index}."), 404
+
+        return item_response(model, user_id, row, 200, index=index)
+
+    except Exception as e:
+        return jsonify(f"Error processing request: {e}"), 500
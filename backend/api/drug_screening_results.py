@@ -1,12 +1,18 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from database import User, db, DrugScreeningResults
+from database import db, DrugScreeningResults
+from response_cache import cached_response, invalidate
+from serializers import serialize
+from validators import validated
+from api.utils import QueryParameterError, conditional_response, insert_record, update_record, delete_record, is_missing_user, json_list_response, is_summary_view, summary_response, get_fields, load_fields, fields_response
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timezone
 
 drug_screening_results_bp = Blueprint('drug_screening_results', __name__)
 
 @drug_screening_results_bp.route('/add_drug_screening_results', methods = ['POST'])
 @jwt_required()
+@validated(DrugScreeningResults)
 def add_drug_screening_results():
     """
     Adds a user's drug_screening_results record to the DrugScreeningResults table in the db.
@@ -29,6 +35,7 @@ def add_drug_screening_results():
     Returns:
         - If successful, adds and returns the user's drug screening results.
         - If the user doesn't exist or user's drug screening results already exists, returns error code 400.
+        - If a required field is missing or a field has the wrong type, returns error code 422.
         - If there is an error processing the request, returns error code 500.
     """
 
@@ -39,35 +46,29 @@ def add_drug_screening_results():
     tests = data.get('tests')
     
     try:
-        user = User.query.filter_by(id=user_id).first()
-
-        # Check if the user exists
-        if not user:
-            return jsonify("This user does not exist."), 400
-        
-        new_drug_screening_results = DrugScreeningResults(
+        new_drug_screening_results = insert_record(
+            DrugScreeningResults,
             user_id=user_id,
             tests=tests,
             date_created=datetime.now(timezone.utc),
             date_last_modified=datetime.now(timezone.utc)
         )
-        db.session.add(new_drug_screening_results)
         db.session.commit()
+        invalidate(user_id, DrugScreeningResults)
 
 
+    except IntegrityError as e:
+        if is_missing_user(e):
+            return jsonify("User not found."), 404
+        return jsonify(f"Error processing request: {e}"), 500
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
 
-    return jsonify({
-        'id': new_drug_screening_results.id, 
-        'user_id': new_drug_screening_results.user_id,
-        'tests': new_drug_screening_results.tests,
-        "date_created": new_drug_screening_results.date_created,
-        "date_last_modified": new_drug_screening_results.date_last_modified
-    }), 201
+    return jsonify(serialize(DrugScreeningResults, new_drug_screening_results)), 201
 
 @drug_screening_results_bp.route('/update_drug_screening_results/<id>', methods = ['PUT'])
 @jwt_required()
+@validated(DrugScreeningResults, defaults=False)
 def update_drug_screening_results(id):
     """
     Updates a user's drug_screening_results record to the DrugScreeningResults table in the db.
@@ -91,6 +92,7 @@ def update_drug_screening_results(id):
     Returns:
         - If successful, updates and returns the user's drug screening results.
         - If the user doesn't exist, returns error code 400.
+        - If a required field is missing or a field has the wrong type, returns error code 422.
         - If there is an error processing the request, returns error code 500.
     """
     data = request.get_json()
@@ -101,29 +103,30 @@ def update_drug_screening_results(id):
 
     try:
         
-        drug_screening_results = db.session.query(DrugScreeningResults).filter_by(user_id=user_id, id=id).first()
-        
+        drug_screening_results = update_record(
+            DrugScreeningResults,
+            user_id,
+            id,
+            tests=tests,
+            date_last_modified=datetime.now(timezone.utc)
+        )
+
         if not drug_screening_results:
             return("drug_screening_results record for this user does not exist.")
 
-        drug_screening_results.tests = tests
-        drug_screening_results.date_last_modified = datetime.now(timezone.utc)
         db.session.commit()
+        invalidate(user_id, DrugScreeningResults)
 
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
 
-    return jsonify({
-        'id': drug_screening_results.id, 
-        'user_id': drug_screening_results.user_id,
-        'tests': drug_screening_results.tests,
-        'date_created': drug_screening_results.date_created,
-        "date_last_modified": drug_screening_results.date_last_modified
-    }), 200
+    return jsonify(serialize(DrugScreeningResults, drug_screening_results)), 200
 
 @drug_screening_results_bp.route('/get_drug_screening_results', methods = ['GET'])
 @drug_screening_results_bp.route('/get_drug_screening_results/<id>', methods = ['GET'])
 @jwt_required()
+@conditional_response(DrugScreeningResults)
+@cached_response(DrugScreeningResults)
 def get_drug_screening_results(id=None):
     """
     Gets a record of the user's drug screening results from the DrugScreeningResults table in the db.
@@ -131,6 +134,12 @@ def get_drug_screening_results(id=None):
     Request JSON Parameters:
         - user_id (str)
     
+    Query Parameters:
+        - fields (str) (optional): Comma separated column names, only these (and id) are loaded and returned.
+        - limit (int) (optional, list only): Page size. When limit or cursor is set, returns { data, next_cursor }.
+        - cursor (str) (optional, list only): The next_cursor from the previous page.
+        - view (str) (optional, list only): 'summary' returns only the id and timestamps of each record.
+    
     Returns:
         - If successful, returns the user's drug screening results.
         - If the user or the drug screening results doesn't exist, returns error code 400.
@@ -139,41 +148,29 @@ def get_drug_screening_results(id=None):
     user_id = get_jwt_identity()
     
     try:
-        user = User.query.filter_by(id=user_id).first()
-
-        if not user:
-            return jsonify("This user does not exist."), 400
+        fields = get_fields(DrugScreeningResults)
 
         if id:
-            drug_screening_results = db.session.query(DrugScreeningResults).filter_by(user_id=user_id, id=id).first()
+            drug_screening_results = db.session.query(DrugScreeningResults).options(*load_fields(DrugScreeningResults, fields)).filter_by(user_id=user_id, id=id).first()
             
             if(not drug_screening_results):
                 return jsonify("Invalid drug screening results id"), 400
-            
-            return jsonify({
-                'id': drug_screening_results.id, 
-                'user_id': drug_screening_results.user_id,
-                'tests': drug_screening_results.tests,
-                "date_created": drug_screening_results.date_created,
-                "date_last_modified": drug_screening_results.date_last_modified
-            }), 200
+
+            return jsonify(serialize(DrugScreeningResults, drug_screening_results, fields)), 200
             
         else:
-            drug_screening_results = db.session.query(DrugScreeningResults).filter_by(user_id=user_id).all()
+            query = db.session.query(DrugScreeningResults).filter_by(user_id=user_id)
 
-            if not drug_screening_results:
-                return jsonify([]), 200
+            if is_summary_view():
+                return summary_response(query, DrugScreeningResults), 200
 
-            drug_screening_results_list = [{
-                'id': record.id, 
-                'user_id': record.user_id,
-                'tests': record.tests,
-                "date_created": record.date_created,
-                "date_last_modified": record.date_last_modified
-            } for record in drug_screening_results]
+            if fields:
+                return fields_response(query, DrugScreeningResults, fields), 200
 
-            return jsonify(drug_screening_results_list), 200
+            return json_list_response(query, DrugScreeningResults), 200
         
+    except QueryParameterError as e:
+        return jsonify(f"{e}"), 400
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
 
@@ -194,13 +191,13 @@ def delete_drug_screening_results(id):
     user_id = get_jwt_identity()
 
     try:
-        drug_screening_results = DrugScreeningResults.query.filter_by(user_id=user_id, id=id).first()
+        drug_screening_results = delete_record(DrugScreeningResults, user_id, id)
 
         if not drug_screening_results:
             return jsonify("drug_screening_results record for this user does not exist."), 400
 
-        db.session.delete(drug_screening_results)
         db.session.commit()
+        invalidate(user_id, DrugScreeningResults)
 
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
@@ -1,12 +1,18 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from database import FamilyAndSupports, db, User
+from database import FamilyAndSupports, db
+from response_cache import cached_response, invalidate
+from serializers import serialize
+from validators import validated
+from api.utils import QueryParameterError, conditional_response, insert_record, update_record, delete_record, is_missing_user, json_list_response, is_summary_view, summary_response, get_fields, load_fields, fields_response
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timezone
 
 family_and_supports_bp = Blueprint('family_and_supports', __name__)
 
 @family_and_supports_bp.route('/add_family_and_supports', methods = ['POST'])
 @jwt_required()
+@validated(FamilyAndSupports)
 def add_family_and_supports():
     """
     Adds a record of user's family and supports to the database.
@@ -36,6 +42,7 @@ def add_family_and_supports():
     Returns:
         - If successful, adds and returns the user's family and supports.
         - If the user doesn't exist or user's family and supports already exists, returns error code 400.
+        - If a required field is missing or a field has the wrong type, returns error code 422.
         - If there is an error processing the request, returns error code 500.    
     """
     data = request.get_json()
@@ -50,12 +57,8 @@ def add_family_and_supports():
     notes = data.get('notes')
     
     try:
-        user = User.query.filter_by(id=user_id).first()
-
-        if(not user):
-            return jsonify({ 'Error': 'Invalid user_id' }), 404
-        
-        new_family_and_supports = FamilyAndSupports(
+        new_family_and_supports = insert_record(
+            FamilyAndSupports,
             user_id=user_id,
             people_living_in_home=people_living_in_home,
             clients_children_not_living_in_home=clients_children_not_living_in_home,
@@ -66,29 +69,23 @@ def add_family_and_supports():
             date_created=datetime.now(timezone.utc),
             date_last_modified=datetime.now(timezone.utc)
         )
-        
-        db.session.add(new_family_and_supports)
         db.session.commit()
+        invalidate(user_id, FamilyAndSupports)
         
+    except IntegrityError as e:
+        if is_missing_user(e):
+            return jsonify("User not found."), 404
+        return jsonify(f"Error processing request: {e}"), 500
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
     
-    return jsonify({
-        "id": new_family_and_supports.id,
-        "user_id": new_family_and_supports.user_id,
-        "people_living_in_home": new_family_and_supports.people_living_in_home,
-        "clients_children_not_living_in_home": new_family_and_supports.clients_children_not_living_in_home,
-        "current_support_system": new_family_and_supports.current_support_system,
-        "strength_of_client_and_support_system": new_family_and_supports.strength_of_client_and_support_system,
-        "goals": new_family_and_supports.goals,
-        "notes": new_family_and_supports.notes,
-        "date_created": new_family_and_supports.date_created,
-        "date_last_modified": new_family_and_supports.date_last_modified
-    }), 201
+    return jsonify(serialize(FamilyAndSupports, new_family_and_supports)), 201
     
 @family_and_supports_bp.route('/get_family_and_supports', methods=['GET'])
 @family_and_supports_bp.route('/get_family_and_supports/<id>', methods=['GET'])
 @jwt_required()
+@conditional_response(FamilyAndSupports)
+@cached_response(FamilyAndSupports)
 def get_family_and_supports_bp(id=None):
     """
     Get a family_and_supports record.
@@ -96,6 +93,12 @@ def get_family_and_supports_bp(id=None):
     Request JSON Parameters:
         - user_id (string)
     
+    Query Parameters:
+        - fields (str) (optional): Comma separated column names, only these (and id) are loaded and returned.
+        - limit (int) (optional, list only): Page size. When limit or cursor is set, returns { data, next_cursor }.
+        - cursor (str) (optional, list only): The next_cursor from the previous page.
+        - view (str) (optional, list only): 'summary' returns only the id and timestamps of each record.
+    
     Returns:
         - If successful, returns a user's family_and_supports record.
         - If the family_and_supports does not exist in the database, returns a message with the error code 400.
@@ -104,56 +107,35 @@ def get_family_and_supports_bp(id=None):
     user_id = get_jwt_identity()
     
     try:
-        user = User.query.filter_by(id=user_id).first()
-
-        if not user:
-            return jsonify("This user does not exist."), 400
+        fields = get_fields(FamilyAndSupports)
 
         if id:
-            family_and_supports = db.session.query(FamilyAndSupports).filter_by(user_id=user_id, id=id).first()
+            family_and_supports = db.session.query(FamilyAndSupports).options(*load_fields(FamilyAndSupports, fields)).filter_by(user_id=user_id, id=id).first()
             
             if(not family_and_supports):
                 return jsonify("Invalid family_and_supports id"), 400
 
-            return jsonify({
-                "id": family_and_supports.id,
-                "user_id": family_and_supports.user_id,
-                "people_living_in_home": family_and_supports.people_living_in_home,
-                "clients_children_not_living_in_home": family_and_supports.clients_children_not_living_in_home,
-                "current_support_system": family_and_supports.current_support_system,
-                "strength_of_client_and_support_system": family_and_supports.strength_of_client_and_support_system,
-                "goals": family_and_supports.goals,
-                "notes": family_and_supports.notes,
-                "date_created": family_and_supports.date_created,
-                "date_last_modified": family_and_supports.date_last_modified
-            }), 200
+            return jsonify(serialize(FamilyAndSupports, family_and_supports, fields)), 200
             
         else:
-            family_and_supports = db.session.query(FamilyAndSupports).filter_by(user_id=user_id).all()
+            query = db.session.query(FamilyAndSupports).filter_by(user_id=user_id)
 
-            if not family_and_supports:
-                return jsonify([]), 200
+            if is_summary_view():
+                return summary_response(query, FamilyAndSupports), 200
 
-            family_and_supports_list = [{
-                "id": record.id,
-                "user_id": record.user_id,
-                "people_living_in_home": record.people_living_in_home,
-                "clients_children_not_living_in_home": record.clients_children_not_living_in_home,
-                "current_support_system": record.current_support_system,
-                "strength_of_client_and_support_system": record.strength_of_client_and_support_system,
-                "goals": record.goals,
-                "notes": record.notes,
-                "date_created": record.date_created,
-                "date_last_modified": record.date_last_modified
-            } for record in family_and_supports]
+            if fields:
+                return fields_response(query, FamilyAndSupports, fields), 200
 
-            return jsonify(family_and_supports_list), 200
+            return json_list_response(query, FamilyAndSupports), 200
             
+    except QueryParameterError as e:
+        return jsonify(f"{e}"), 400
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
     
 @family_and_supports_bp.route('/update_family_and_supports/<id>', methods = ['PUT'])
 @jwt_required()
+@validated(FamilyAndSupports, defaults=False)
 def update_family_and_supports(id):
     """
     Updates a record of user's family and supports to the database.
@@ -178,6 +160,7 @@ def update_family_and_supports(id):
     Returns:
         - If successful, updates and returns the user's family and supports.
         - If the user doesn't exist or user's family and supports already exists, returns error code 400.
+        - If a required field is missing or a field has the wrong type, returns error code 422.
         - If there is an error processing the request, returns error code 500.    
     """
     data = request.get_json()
@@ -192,41 +175,29 @@ def update_family_and_supports(id):
     notes = data.get('notes')
     
     try:
-        user = User.query.filter_by(id=user_id).first()
-
-        if(not user):
-            return jsonify({ 'Error': 'Invalid user_id' }), 403
-        
-        family_and_supports = db.session.query(FamilyAndSupports).filter_by(user_id=user_id, id=id).first()
+        family_and_supports = update_record(
+            FamilyAndSupports,
+            user_id,
+            id,
+            people_living_in_home=people_living_in_home,
+            clients_children_not_living_in_home=clients_children_not_living_in_home,
+            current_support_system=current_support_system,
+            strength_of_client_and_support_system=strength_of_client_and_support_system,
+            goals=goals,
+            notes=notes,
+            date_last_modified=datetime.now(timezone.utc)
+        )
 
         if not family_and_supports:
             return jsonify("This user does not exist."), 400
-        
-        family_and_supports.user_id=user_id
-        family_and_supports.people_living_in_home=people_living_in_home
-        family_and_supports.clients_children_not_living_in_home=clients_children_not_living_in_home
-        family_and_supports.current_support_system=current_support_system
-        family_and_supports.strength_of_client_and_support_system=strength_of_client_and_support_system
-        family_and_supports.goals=goals
-        family_and_supports.notes=notes
-        family_and_supports.date_last_modified=datetime.now(timezone.utc)
+
         db.session.commit()
+        invalidate(user_id, FamilyAndSupports)
         
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
     
-    return jsonify({
-        "id": family_and_supports.id,
-        "user_id": family_and_supports.user_id,
-        "people_living_in_home": family_and_supports.people_living_in_home,
-        "clients_children_not_living_in_home": family_and_supports.clients_children_not_living_in_home,
-        "current_support_system": family_and_supports.current_support_system,
-        "strength_of_client_and_support_system": family_and_supports.strength_of_client_and_support_system,
-        "goals": family_and_supports.goals,
-        "notes": notes,
-        "date_created": family_and_supports.date_created,
-        "date_last_modified": family_and_supports.date_last_modified
-    }), 200
+    return jsonify(serialize(FamilyAndSupports, family_and_supports)), 200
     
 @family_and_supports_bp.route('/delete_family_and_supports/<id>', methods = ['DELETE'])
 @jwt_required()
@@ -245,10 +216,13 @@ def delete_family_and_supports(id):
     user_id = get_jwt_identity()
     
     try:
-        family_and_supports = FamilyAndSupports.query.filter_by(user_id=user_id, id=id).first()
+        family_and_supports = delete_record(FamilyAndSupports, user_id, id)
+
+        if not family_and_supports:
+            return jsonify("family_and_supports record does not exist for this user."), 400
 
-        db.session.delete(family_and_supports)
         db.session.commit()
+        invalidate(user_id, FamilyAndSupports)
     except Exception as e:
         return jsonify(f"Error processing request"), 500
 
@@ -1,12 +1,18 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from database import InfantInformation, db, User
+from database import InfantInformation, db
+from response_cache import cached_response, invalidate
+from serializers import serialize
+from validators import validated
+from api.utils import QueryParameterError, conditional_response, insert_record, update_record, delete_record, is_missing_user, json_list_response, is_summary_view, summary_response, get_fields, load_fields, fields_response
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timezone
 
 infant_information_bp = Blueprint('infant_information', __name__)
 
 @infant_information_bp.route('/add_infant_information', methods = ['POST'])
 @jwt_required()
+@validated(InfantInformation)
 def add_infant_information():
     """
     Adds a infant_information record for a user to the database.
@@ -78,6 +84,7 @@ def add_infant_information():
     Returns:
         - If successful, adds and returns the user's new infant information.
         - If the infant information from this user already exists in the database, returns error messsage with error code 400.
+        - If a required field is missing or a field has the wrong type, returns error code 422.
         - If there is an unexpected error, returns error message with the error code 500.
     """
     
@@ -119,12 +126,8 @@ def add_infant_information():
     father_notes=data.get('father_notes')
     
     try:
-        user = db.session.query(User).filter_by(id=user_id).first()
-        
-        if not user:
-            return jsonify("User not found."), 404
-        
-        new_infant_information = InfantInformation(
+        new_infant_information = insert_record(
+            InfantInformation,
             user_id=user_id,
             child_name=child_name,
             date_of_birth=date_of_birth,
@@ -161,54 +164,22 @@ def add_infant_information():
             date_created=datetime.now(timezone.utc),
             date_last_modified=datetime.now(timezone.utc)
         )
-        
-        db.session.add(new_infant_information)
         db.session.commit()
+        invalidate(user_id, InfantInformation)
+    except IntegrityError as e:
+        if is_missing_user(e):
+            return jsonify("User not found."), 404
+        return jsonify(f"Error processing request: {e}"), 500
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
     
-    return jsonify({
-        "id":new_infant_information.id,
-        "user_id":new_infant_information.user_id,
-        "child_name":new_infant_information.child_name,
-        "date_of_birth":new_infant_information.date_of_birth,
-        "sex":new_infant_information.sex,
-        "birth_weight":new_infant_information.birth_weight,
-        "gestational_age_at_birth":new_infant_information.gestational_age_at_birth,
-        "NICU_stay":new_infant_information.NICU_stay,
-        "NICU_length_of_stay":new_infant_information.NICU_length_of_stay,
-        "pediatrician_name":new_infant_information.pediatrician_name,
-        "pediatrician_contact_info":new_infant_information.pediatrician_contact_info,
-        "infant_urine_drug_screening_at_birth":new_infant_information.infant_urine_drug_screening_at_birth,
-        "infant_urine_drug_screening_at_birth_specify":new_infant_information.infant_urine_drug_screening_at_birth_specify,
-        "meconium_results":new_infant_information.meconium_results,
-        "meconium_results_specify":new_infant_information.meconium_results_specify,
-        "neonatal_opiod_withdraw":new_infant_information.neonatal_opiod_withdraw,
-        "neonatal_opiod_withdraw_treatment_method":new_infant_information.neonatal_opiod_withdraw_treatment_method,
-        "DX_problems_additional_information":new_infant_information.DX_problems_additional_information,
-        "infant_care_needs_items": new_infant_information.infant_care_needs_items,
-        "where_will_baby_sleep": new_infant_information.where_will_baby_sleep,
-        "where_will_baby_sleep_specify": new_infant_information.where_will_baby_sleep_specify,
-        "infant_care_needs_additional_notes": new_infant_information.infant_care_needs_additional_notes, 
-        "infant_medications": new_infant_information.infant_medications,
-        "infant_medication_notes": new_infant_information.infant_medication_notes,
-        "father_name": new_infant_information.father_name,
-        "father_date_of_birth": new_infant_information.father_date_of_birth,
-        "father_street_address": new_infant_information.father_street_address,
-        "father_city": new_infant_information.father_city,
-        "father_state": new_infant_information.father_state,
-        "father_zip_code": new_infant_information.father_zip_code,
-        "father_primary_phone_numbers": new_infant_information.father_primary_phone_numbers,
-        "father_involved_in_babys_life": new_infant_information.father_involved_in_babys_life,
-        "father_involved_in_babys_life_comments": new_infant_information.father_involved_in_babys_life_comments,
-        "father_notes": new_infant_information.father_notes,
-        "date_created": new_infant_information.date_created,
-        "date_last_modified": new_infant_information.date_last_modified
-    }), 201
+    return jsonify(serialize(InfantInformation, new_infant_information)), 201
 
 @infant_information_bp.route('/get_infant_information', methods = ['GET'])
 @infant_information_bp.route('/get_infant_information/<id>', methods = ['GET'])
 @jwt_required()
+@conditional_response(InfantInformation)
+@cached_response(InfantInformation)
 def get_infant_information(id=None):
     """
     Get a infant_information record 
@@ -216,6 +187,12 @@ def get_infant_information(id=None):
     Request JSON Parameters:
         - user_id (string)
         
+    Query Parameters:
+        - fields (str) (optional): Comma separated column names, only these (and id) are loaded and returned.
+        - limit (int) (optional, list only): Page size. When limit or cursor is set, returns { data, next_cursor }.
+        - cursor (str) (optional, list only): The next_cursor from the previous page.
+        - view (str) (optional, list only): 'summary' returns only id, child_name and the timestamps of each record.
+    
     Returns:
         - If successful, returns a user's infant_information record.
         - If the infant information does not exist in the database, returns a message with the error code 400.
@@ -224,108 +201,35 @@ def get_infant_information(id=None):
     user_id = get_jwt_identity()
     
     try:
-        user = db.session.query(User).filter_by(id=user_id).first()
-        
-        if not user:
-            return jsonify("User not found."), 404
-        
+        fields = get_fields(InfantInformation)
+
         if id:
-            infant_information = db.session.query(InfantInformation).filter_by(user_id=user_id, id=id).first()
+            infant_information = db.session.query(InfantInformation).options(*load_fields(InfantInformation, fields)).filter_by(user_id=user_id, id=id).first()
 
             if(not infant_information):
                 return jsonify("Invalid infant_information id"), 400
 
-            return jsonify({
-                "id":infant_information.id,
-                "user_id":infant_information.user_id,
-                "child_name":infant_information.child_name,
-                "date_of_birth":infant_information.date_of_birth,
-                "sex":infant_information.sex,
-                "birth_weight":infant_information.birth_weight,
-                "gestational_age_at_birth":infant_information.gestational_age_at_birth,
-                "NICU_stay":infant_information.NICU_stay,
-                "NICU_length_of_stay":infant_information.NICU_length_of_stay,
-                "pediatrician_name":infant_information.pediatrician_name,
-                "pediatrician_contact_info":infant_information.pediatrician_contact_info,
-                "infant_urine_drug_screening_at_birth":infant_information.infant_urine_drug_screening_at_birth,
-                "infant_urine_drug_screening_at_birth_specify":infant_information.infant_urine_drug_screening_at_birth_specify,
-                "meconium_results":infant_information.meconium_results,
-                "meconium_results_specify":infant_information.meconium_results_specify,
-                "neonatal_opiod_withdraw":infant_information.neonatal_opiod_withdraw,
-                "neonatal_opiod_withdraw_treatment_method":infant_information.neonatal_opiod_withdraw_treatment_method,
-                "DX_problems_additional_information":infant_information.DX_problems_additional_information,
-                "infant_care_needs_items": infant_information.infant_care_needs_items,
-                "where_will_baby_sleep": infant_information.where_will_baby_sleep,
-                "where_will_baby_sleep_specify": infant_information.where_will_baby_sleep_specify,
-                "infant_care_needs_additional_notes": infant_information.infant_care_needs_additional_notes, 
-                "infant_medications": infant_information.infant_medications,
-                "infant_medication_notes": infant_information.infant_medication_notes,
-                "father_name": infant_information.father_name,
-                "father_date_of_birth": infant_information.father_date_of_birth,
-                "father_street_address": infant_information.father_street_address,
-                "father_city": infant_information.father_city,
-                "father_state": infant_information.father_state,
-                "father_zip_code": infant_information.father_zip_code,
-                "father_primary_phone_numbers": infant_information.father_primary_phone_numbers,
-                "father_involved_in_babys_life": infant_information.father_involved_in_babys_life,
-                "father_involved_in_babys_life_comments": infant_information.father_involved_in_babys_life_comments,
-                "father_notes": infant_information.father_notes,
-                "date_created": infant_information.date_created,
-                "date_last_modified": infant_information.date_last_modified
-            }), 200
+            return jsonify(serialize(InfantInformation, infant_information, fields)), 200
             
         else:
-            infant_information = db.session.query(InfantInformation).filter_by(user_id=user_id).all()
+            query = db.session.query(InfantInformation).filter_by(user_id=user_id)
 
-            if not infant_information:
-                return jsonify([]), 200
+            if is_summary_view():
+                return summary_response(query, InfantInformation, InfantInformation.child_name), 200
 
-            infant_information_list = [{
-                "id":record.id,
-                "user_id":record.user_id,
-                "child_name":record.child_name,
-                "date_of_birth":record.date_of_birth,
-                "sex":record.sex,
-                "birth_weight":record.birth_weight,
-                "gestational_age_at_birth":record.gestational_age_at_birth,
-                "NICU_stay":record.NICU_stay,
-                "NICU_length_of_stay":record.NICU_length_of_stay,
-                "pediatrician_name":record.pediatrician_name,
-                "pediatrician_contact_info":record.pediatrician_contact_info,
-                "infant_urine_drug_screening_at_birth":record.infant_urine_drug_screening_at_birth,
-                "infant_urine_drug_screening_at_birth_specify":record.infant_urine_drug_screening_at_birth_specify,
-                "meconium_results":record.meconium_results,
-                "meconium_results_specify":record.meconium_results_specify,
-                "neonatal_opiod_withdraw":record.neonatal_opiod_withdraw,
-                "neonatal_opiod_withdraw_treatment_method":record.neonatal_opiod_withdraw_treatment_method,
-                "DX_problems_additional_information":record.DX_problems_additional_information,
-                "infant_care_needs_items": record.infant_care_needs_items,
-                "where_will_baby_sleep": record.where_will_baby_sleep,
-                "where_will_baby_sleep_specify": record.where_will_baby_sleep_specify,
-                "infant_care_needs_additional_notes": record.infant_care_needs_additional_notes, 
-                "infant_medications": record.infant_medications,
-                "infant_medication_notes": record.infant_medication_notes,
-                "father_name": record.father_name,
-                "father_date_of_birth": record.father_date_of_birth,
-                "father_street_address": record.father_street_address,
-                "father_city": record.father_city,
-                "father_state": record.father_state,
-                "father_zip_code": record.father_zip_code,
-                "father_primary_phone_numbers": record.father_primary_phone_numbers,
-                "father_involved_in_babys_life": record.father_involved_in_babys_life,
-                "father_involved_in_babys_life_comments": record.father_involved_in_babys_life_comments,
-                "father_notes": record.father_notes,
-                "date_created": record.date_created,
-                "date_last_modified": record.date_last_modified
-            } for record in infant_information]
+            if fields:
+                return fields_response(query, InfantInformation, fields), 200
 
-            return jsonify(infant_information_list), 200
+            return json_list_response(query, InfantInformation), 200
 
+    except QueryParameterError as e:
+        return jsonify(f"{e}"), 400
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
 
 @infant_information_bp.route('/update_infant_information/<id>', methods = ['PUT'])
 @jwt_required()
+@validated(InfantInformation, defaults=False)
 def update_infant_information(id):
     """
     Updates an infant_information record.
@@ -386,6 +290,7 @@ def update_infant_information(id):
     Returns:
         - If successful, updates and returns a user's infant_information form.
         - If there is no infant_information record for this user in the database, returns a message with error 400.
+        - If a required field is missing or a field has the wrong type, returns error code 422.
         - If there is an unexpected error, returns a JSON error message with the error code 500.
     """
     data = request.get_json()
@@ -426,86 +331,54 @@ def update_infant_information(id):
     father_notes=data.get('father_notes')
     
     try:
-        infant_information = db.session.query(InfantInformation).filter_by(user_id=user_id, id=id).first()
-        
+        infant_information = update_record(
+            InfantInformation,
+            user_id,
+            id,
+            child_name=child_name,
+            date_of_birth=date_of_birth,
+            sex=sex,
+            birth_weight=birth_weight,
+            gestational_age_at_birth=gestational_age_at_birth,
+            NICU_stay=NICU_stay,
+            NICU_length_of_stay=NICU_length_of_stay,
+            pediatrician_name=pediatrician_name,
+            pediatrician_contact_info=pediatrician_contact_info,
+            infant_urine_drug_screening_at_birth=infant_urine_drug_screening_at_birth,
+            infant_urine_drug_screening_at_birth_specify=infant_urine_drug_screening_at_birth_specify,
+            meconium_results=meconium_results,
+            meconium_results_specify=meconium_results_specify,
+            neonatal_opiod_withdraw=neonatal_opiod_withdraw,
+            neonatal_opiod_withdraw_treatment_method=neonatal_opiod_withdraw_treatment_method,
+            DX_problems_additional_information=DX_problems_additional_information,
+            infant_care_needs_items=infant_care_needs_items,
+            where_will_baby_sleep=where_will_baby_sleep,
+            where_will_baby_sleep_specify=where_will_baby_sleep_specify,
+            infant_care_needs_additional_notes=infant_care_needs_additional_notes,
+            infant_medications=infant_medications,
+            infant_medication_notes=infant_medication_notes,
+            father_name=father_name,
+            father_date_of_birth=father_date_of_birth,
+            father_street_address=father_street_address,
+            father_city=father_city,
+            father_state=father_state,
+            father_zip_code=father_zip_code,
+            father_primary_phone_numbers=father_primary_phone_numbers,
+            father_involved_in_babys_life=father_involved_in_babys_life,
+            father_involved_in_babys_life_comments=father_involved_in_babys_life_comments,
+            father_notes=father_notes,
+            date_last_modified=datetime.now(timezone.utc)
+        )
+
         if not infant_information:
             return jsonify("Infant information does not exist for this user."), 400
-        
-        infant_information.child_name=child_name
-        infant_information.date_of_birth=date_of_birth
-        infant_information.sex=sex
-        infant_information.birth_weight=birth_weight
-        infant_information.gestational_age_at_birth=gestational_age_at_birth
-        infant_information.NICU_stay=NICU_stay
-        infant_information.NICU_length_of_stay=NICU_length_of_stay
-        infant_information.pediatrician_name=pediatrician_name
-        infant_information.pediatrician_contact_info=pediatrician_contact_info
-        infant_information.infant_urine_drug_screening_at_birth=infant_urine_drug_screening_at_birth
-        infant_information.infant_urine_drug_screening_at_birth_specify=infant_urine_drug_screening_at_birth_specify
-        infant_information.meconium_results=meconium_results
-        infant_information.meconium_results_specify=meconium_results_specify
-        infant_information.neonatal_opiod_withdraw=neonatal_opiod_withdraw
-        infant_information.neonatal_opiod_withdraw_treatment_method=neonatal_opiod_withdraw_treatment_method
-        infant_information.DX_problems_additional_information=DX_problems_additional_information
-        infant_information.infant_care_needs_items=infant_care_needs_items
-        infant_information.where_will_baby_sleep=where_will_baby_sleep
-        infant_information.where_will_baby_sleep_specify=where_will_baby_sleep_specify
-        infant_information.infant_care_needs_additional_notes=infant_care_needs_additional_notes
-        infant_information.infant_medications=infant_medications
-        infant_information.infant_medication_notes=infant_medication_notes
-        infant_information.father_name=father_name
-        infant_information.father_date_of_birth=father_date_of_birth
-        infant_information.father_street_address=father_street_address
-        infant_information.father_city=father_city
-        infant_information.father_state=father_state
-        infant_information.father_zip_code=father_zip_code
-        infant_information.father_primary_phone_numbers=father_primary_phone_numbers
-        infant_information.father_involved_in_babys_life=father_involved_in_babys_life
-        infant_information.father_involved_in_babys_life_comments=father_involved_in_babys_life_comments
-        infant_information.father_notes=father_notes
-        infant_information.date_last_modified=datetime.now(timezone.utc)
+
         db.session.commit()
+        invalidate(user_id, InfantInformation)
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
     
-    return jsonify({
-        "id":infant_information.id,
-        "user_id":infant_information.user_id,
-        "child_name":infant_information.child_name,
-        "date_of_birth":infant_information.date_of_birth,
-        "sex":infant_information.sex,
-        "birth_weight":infant_information.birth_weight,
-        "gestational_age_at_birth":infant_information.gestational_age_at_birth,
-        "NICU_stay":infant_information.NICU_stay,
-        "NICU_length_of_stay":infant_information.NICU_length_of_stay,
-        "pediatrician_name":infant_information.pediatrician_name,
-        "pediatrician_contact_info":infant_information.pediatrician_contact_info,
-        "infant_urine_drug_screening_at_birth":infant_information.infant_urine_drug_screening_at_birth,
-        "infant_urine_drug_screening_at_birth_specify":infant_information.infant_urine_drug_screening_at_birth_specify,
-        "meconium_results":infant_information.meconium_results,
-        "meconium_results_specify":infant_information.meconium_results_specify,
-        "neonatal_opiod_withdraw":infant_information.neonatal_opiod_withdraw,
-        "neonatal_opiod_withdraw_treatment_method":infant_information.neonatal_opiod_withdraw_treatment_method,
-        "DX_problems_additional_information":infant_information.DX_problems_additional_information,
-        "infant_care_needs_items": infant_information.infant_care_needs_items,
-        "where_will_baby_sleep": infant_information.where_will_baby_sleep,
-        "where_will_baby_sleep_specify": infant_information.where_will_baby_sleep_specify,
-        "infant_care_needs_additional_notes": infant_information.infant_care_needs_additional_notes, 
-        "infant_medications": infant_information.infant_medications,
-        "infant_medication_notes": infant_information.infant_medication_notes,
-        "father_name": infant_information.father_name,
-        "father_date_of_birth": infant_information.father_date_of_birth,
-        "father_street_address": infant_information.father_street_address,
-        "father_city": infant_information.father_city,
-        "father_state": infant_information.father_state,
-        "father_zip_code": infant_information.father_zip_code,
-        "father_primary_phone_numbers": infant_information.father_primary_phone_numbers,
-        "father_involved_in_babys_life": infant_information.father_involved_in_babys_life,
-        "father_involved_in_babys_life_comments": infant_information.father_involved_in_babys_life_comments,
-        "father_notes": infant_information.father_notes,
-        "date_created": infant_information.date_created,
-        "date_last_modified": infant_information.date_last_modified
-    }), 201
+    return jsonify(serialize(InfantInformation, infant_information)), 201
     
 @infant_information_bp.route('/delete_infant_information/<id>', methods = ['DELETE'])
 @jwt_required()
@@ -524,13 +397,13 @@ def delete_infant_information(id):
     user_id = get_jwt_identity()
 
     try:
-        infant_information = db.session.query(InfantInformation).filter_by(user_id=user_id, id=id).first()
-        
+        infant_information = delete_record(InfantInformation, user_id, id)
+
         if not infant_information:
             return jsonify('Infant information does not exist.'), 400
 
-        db.session.delete(infant_information)
         db.session.commit()
+        invalidate(user_id, InfantInformation)
 
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
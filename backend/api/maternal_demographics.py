@@ -1,12 +1,18 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from database import MaternalDemographics, db, User
+from database import MaternalDemographics, db
+from response_cache import cached_response, invalidate
+from serializers import serialize
+from validators import validated
+from api.utils import QueryParameterError, conditional_response, insert_record, update_record, delete_record, is_missing_user, json_list_response, is_summary_view, summary_response, get_fields, load_fields, fields_response
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timezone
 
 maternal_demo_bp = Blueprint('maternal_demographics', __name__)
 
 @maternal_demo_bp.route('/add_maternal_demographics', methods=['POST'])
 @jwt_required()
+@validated(MaternalDemographics)
 def add_maternal_demographics():
     """
     Adds a maternal_demographics record for a user to the database.
@@ -35,6 +41,7 @@ def add_maternal_demographics():
     Returns:
         - If successful, adds and returns the user's new maternal demographic.
         - If the demographics from this user already exists in the database, returns error messsage with error code 400.
+        - If a required field is missing or a field has the wrong type, returns error code 422.
         - If there is an unexpected error, returns error message with the error code 500.
     """
     data = request.get_json()
@@ -61,12 +68,8 @@ def add_maternal_demographics():
     group_id = data.get('group_id')
 
     try:
-        user = db.session.query(User).filter_by(id=user_id).first()
-
-        if not user:
-            return jsonify("User not found."), 404
-        
-        new_maternal_demographics = MaternalDemographics(
+        new_maternal_demographics = insert_record(
+            MaternalDemographics,
             user_id=user_id,
             name=name,
             date_of_birth=date_of_birth,
@@ -89,40 +92,22 @@ def add_maternal_demographics():
             date_created=datetime.now(timezone.utc),
             date_last_modified=datetime.now(timezone.utc)
         )
-
-        db.session.add(new_maternal_demographics)
         db.session.commit()
+        invalidate(user_id, MaternalDemographics)
+    except IntegrityError as e:
+        if is_missing_user(e):
+            return jsonify("User not found."), 404
+        return jsonify(f"Error processing request: {e}"), 500
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
 
-    return jsonify({
-        "id": new_maternal_demographics.id,
-        "user_id": new_maternal_demographics.user_id,
-        "name": new_maternal_demographics.name,
-        "date_of_birth": new_maternal_demographics.date_of_birth,
-        "current_living_arrangement": new_maternal_demographics.current_living_arrangement,
-        "street_address": new_maternal_demographics.street_address,
-        "city": new_maternal_demographics.city,
-        "state": new_maternal_demographics.state,
-        "zip_code": new_maternal_demographics.zip_code,
-        "county": new_maternal_demographics.county,
-        "primary_phone_number": new_maternal_demographics.primary_phone_number,
-        "phone_type": new_maternal_demographics.phone_type,
-        "emergency_contact": new_maternal_demographics.emergency_contact,
-        "emergency_contact_phone": new_maternal_demographics.emergency_contact_phone,
-        "relationship": new_maternal_demographics.relationship,
-        "marital_status": new_maternal_demographics.marital_status,
-        "insurance_plan": new_maternal_demographics.insurance_plan,
-        "effective_date": new_maternal_demographics.effective_date,
-        "subscriber_id": new_maternal_demographics.subscriber_id,
-        "group_id": new_maternal_demographics.group_id,
-        "date_created": new_maternal_demographics.date_created,
-        "date_last_modified": new_maternal_demographics.date_last_modified
-    }), 201
+    return jsonify(serialize(MaternalDemographics, new_maternal_demographics)), 201
 
 @maternal_demo_bp.route('/get_maternal_demographics', methods = ['GET'])
 @maternal_demo_bp.route('/get_maternal_demographics/<id>', methods = ['GET'])
 @jwt_required()
+@conditional_response(MaternalDemographics)
+@cached_response(MaternalDemographics)
 def get_maternal_demographics(id=None):
     """
     Get a maternal_demographics record 
@@ -131,6 +116,12 @@ def get_maternal_demographics(id=None):
         - user_id (string)
         - id (string) (optional)
         
+    Query Parameters:
+        - fields (str) (optional): Comma separated column names, only these (and id) are loaded and returned.
+        - limit (int) (optional, list only): Page size. When limit or cursor is set, returns { data, next_cursor }.
+        - cursor (str) (optional, list only): The next_cursor from the previous page.
+        - view (str) (optional, list only): 'summary' returns only id, name and the timestamps of each record.
+    
     Returns:
         - If the user sends the user_id as a parameter, returns all instances for that user_id
         - If the user sends both user_id and id as parameter, returns specific instance
@@ -142,80 +133,35 @@ def get_maternal_demographics(id=None):
     user_id = get_jwt_identity()
 
     try:
-        user = db.session.query(User).filter_by(id=user_id).first()
+        fields = get_fields(MaternalDemographics)
 
-        if not user:
-            return jsonify("User not found."), 404
-        
         if id:
-            maternal_demographics = db.session.query(MaternalDemographics).filter_by(user_id=user_id, id=id).first()
+            maternal_demographics = db.session.query(MaternalDemographics).options(*load_fields(MaternalDemographics, fields)).filter_by(user_id=user_id, id=id).first()
             
             if(not maternal_demographics):
                 return jsonify("Invalid maternal_demographics id"), 400
 
-            return jsonify({
-                "id": maternal_demographics.id,
-                "user_id": maternal_demographics.user_id,
-                "name": maternal_demographics.name,
-                "date_of_birth": maternal_demographics.date_of_birth,
-                "current_living_arrangement": maternal_demographics.current_living_arrangement,
-                "street_address": maternal_demographics.street_address,
-                "city": maternal_demographics.city,
-                "state": maternal_demographics.state,
-                "zip_code": maternal_demographics.zip_code,
-                "county": maternal_demographics.county,
-                "primary_phone_number": maternal_demographics.primary_phone_number,
-                "phone_type": maternal_demographics.phone_type,
-                "emergency_contact": maternal_demographics.emergency_contact,
-                "emergency_contact_phone": maternal_demographics.emergency_contact_phone,
-                "relationship": maternal_demographics.relationship,
-                "marital_status": maternal_demographics.marital_status,
-                "insurance_plan": maternal_demographics.insurance_plan,
-                "effective_date": maternal_demographics.effective_date,
-                "subscriber_id": maternal_demographics.subscriber_id,
-                "group_id": maternal_demographics.group_id,
-                "date_created": maternal_demographics.date_created,
-                "date_last_modified": maternal_demographics.date_last_modified
-            }), 200
+            return jsonify(serialize(MaternalDemographics, maternal_demographics, fields)), 200
             
         else:
-            maternal_demographics = db.session.query(MaternalDemographics).filter_by(user_id=user_id).all()
+            query = db.session.query(MaternalDemographics).filter_by(user_id=user_id)
 
-            if not maternal_demographics:
-                return jsonify([]), 200
+            if is_summary_view():
+                return summary_response(query, MaternalDemographics, MaternalDemographics.name), 200
 
-            maternal_demographics_list = [{
-                "id": record.id,
-                "user_id": record.user_id,
-                "name": record.name,
-                "date_of_birth": record.date_of_birth,
-                "current_living_arrangement": record.current_living_arrangement,
-                "street_address": record.street_address,
-                "city": record.city,
-                "state": record.state,
-                "zip_code": record.zip_code,
-                "county": record.county,
-                "primary_phone_number": record.primary_phone_number,
-                "phone_type": record.phone_type,
-                "emergency_contact": record.emergency_contact,
-                "emergency_contact_phone": record.emergency_contact_phone,
-                "relationship": record.relationship,
-                "marital_status": record.marital_status,
-                "insurance_plan": record.insurance_plan,
-                "effective_date": record.effective_date,
-                "subscriber_id": record.subscriber_id,
-                "group_id": record.group_id,
-                "date_created": record.date_created,
-                "date_last_modified": record.date_last_modified
-            } for record in maternal_demographics]
+            if fields:
+                return fields_response(query, MaternalDemographics, fields), 200
 
-            return jsonify(maternal_demographics_list), 200
+            return json_list_response(query, MaternalDemographics), 200
             
+    except QueryParameterError as e:
+        return jsonify(f"{e}"), 400
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
 
 @maternal_demo_bp.route('/update_maternal_demographics/<id>', methods=['PUT'])
 @jwt_required()
+@validated(MaternalDemographics, defaults=False)
 def update_maternal_demographics(id):
     """
     Updates a user's maternal demographics. 
@@ -244,6 +190,7 @@ def update_maternal_demographics(id):
     Returns:
         - If successful, updates and returns the user's maternal_demographics_record.
         - If there is no maternal demographic for the user in the database, returns a message with error 400.
+        - If a required field is missing or a field has the wrong type, returns error code 422.
         - If there is an unexpected error, returns a JSON error message with the error code 500.
     """
     data = request.get_json()
@@ -268,59 +215,40 @@ def update_maternal_demographics(id):
     group_id = data.get('group_id')
 
     try:
-        maternal_demographics = db.session.query(
-            MaternalDemographics).filter_by(user_id=user_id, id=id).first()
+        maternal_demographics = update_record(
+            MaternalDemographics,
+            user_id,
+            id,
+            name=name,
+            date_of_birth=date_of_birth,
+            current_living_arrangement=current_living_arrangement,
+            street_address=street_address,
+            city=city,
+            state=state,
+            zip_code=zip_code,
+            county=county,
+            primary_phone_number=primary_phone_number,
+            phone_type=phone_type,
+            emergency_contact=emergency_contact,
+            emergency_contact_phone=emergency_contact_phone,
+            relationship=relationship,
+            marital_status=marital_status,
+            insurance_plan=insurance_plan,
+            effective_date=effective_date,
+            subscriber_id=subscriber_id,
+            group_id=group_id,
+            date_last_modified=datetime.now(timezone.utc)
+        )
 
         if not maternal_demographics:
             return jsonify("Maternal Demographics does not exist."), 400
 
-        maternal_demographics.name = name
-        maternal_demographics.date_of_birth = date_of_birth
-        maternal_demographics.current_living_arrangement = current_living_arrangement
-        maternal_demographics.street_address = street_address
-        maternal_demographics.city = city
-        maternal_demographics.state = state
-        maternal_demographics.zip_code = zip_code
-        maternal_demographics.county = county
-        maternal_demographics.primary_phone_number = primary_phone_number
-        maternal_demographics.phone_type = phone_type
-        maternal_demographics.emergency_contact = emergency_contact
-        maternal_demographics.emergency_contact_phone = emergency_contact_phone
-        maternal_demographics.relationship = relationship
-        maternal_demographics.marital_status = marital_status
-        maternal_demographics.insurance_plan = insurance_plan
-        maternal_demographics.effective_date = effective_date
-        maternal_demographics.subscriber_id = subscriber_id
-        maternal_demographics.group_id = group_id
-        maternal_demographics.date_last_modified = datetime.now(timezone.utc)
         db.session.commit()
+        invalidate(user_id, MaternalDemographics)
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
 
-    return jsonify({
-        "id": maternal_demographics.id,
-        "user_id": maternal_demographics.user_id,
-        "name": maternal_demographics.name,
-        "date_of_birth": maternal_demographics.date_of_birth,
-        "current_living_arrangement": maternal_demographics.current_living_arrangement,
-        "street_address": maternal_demographics.street_address,
-        "city": maternal_demographics.city,
-        "state": maternal_demographics.state,
-        "zip_code": maternal_demographics.zip_code,
-        "county": maternal_demographics.county,
-        "primary_phone_number": maternal_demographics.primary_phone_number,
-        "phone_type": maternal_demographics.phone_type,
-        "emergency_contact": maternal_demographics.emergency_contact,
-        "emergency_contact_phone": maternal_demographics.emergency_contact_phone,
-        "relationship": maternal_demographics.relationship,
-        "marital_status": maternal_demographics.marital_status,
-        "insurance_plan": maternal_demographics.insurance_plan,
-        "effective_date": maternal_demographics.effective_date,
-        "subscriber_id": maternal_demographics.subscriber_id,
-        "group_id": maternal_demographics.group_id,
-        "date_created": maternal_demographics.date_created,
-        "date_last_modified": maternal_demographics.date_last_modified
-    })
+    return jsonify(serialize(MaternalDemographics, maternal_demographics))
 
 
 @maternal_demo_bp.route('/delete_maternal_demographics/<id>', methods=['DELETE'])
@@ -340,14 +268,13 @@ def delete_maternal_demographics(id):
     user_id = get_jwt_identity()
 
     try:
-        maternal_demographics = db.session.query(
-            MaternalDemographics).filter_by(user_id=user_id, id=id).first()
+        maternal_demographics = delete_record(MaternalDemographics, user_id, id)
 
         if not maternal_demographics:
             return jsonify('There is no user with this information.'), 400
 
-        db.session.delete(maternal_demographics)
         db.session.commit()
+        invalidate(user_id, MaternalDemographics)
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
 
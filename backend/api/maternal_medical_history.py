@@ -1,12 +1,18 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from database import MaternalMedicalHistory, db, User
+from database import MaternalMedicalHistory, db
+from response_cache import cached_response, invalidate
+from serializers import serialize
+from validators import validated
+from api.utils import QueryParameterError, conditional_response, insert_record, update_record, delete_record, is_missing_user, json_list_response, is_summary_view, summary_response, get_fields, load_fields, fields_response
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timezone
 
 medical_history_bp = Blueprint('maternal_medical_history', __name__)
 
 @medical_history_bp.route('/add_maternal_medical_history', methods=['POST'])
 @jwt_required()
+@validated(MaternalMedicalHistory)
 def add_medical_history():
     """
     Create a maternal_medical_history record for a user
@@ -38,6 +44,7 @@ def add_medical_history():
     Returns:
         - If successful, adds and returns the user's new medical history.
         - If medical history from this user already exists, returns error messsage with error code 400.
+        - If a required field is missing or a field has the wrong type, returns error code 422.
         - If there is an unexpected error, returns error message with the error code 500.
     """
     data = request.get_json()
@@ -60,12 +67,8 @@ def add_medical_history():
     notes = data.get('notes')
 
     try:
-        user = db.session.query(User).filter_by(id=user_id).first()
-
-        if not user:
-            return jsonify("User not found."), 404
-
-        new_maternal_medical_history = MaternalMedicalHistory(
+        new_maternal_medical_history = insert_record(
+            MaternalMedicalHistory,
             user_id=user_id,
             gestational_age=gestational_age,
             anticipated_delivery_date=anticipated_delivery_date,
@@ -84,41 +87,33 @@ def add_medical_history():
             date_created=datetime.now(timezone.utc),
             date_last_modified=datetime.now(timezone.utc)
         )
-
-        db.session.add(new_maternal_medical_history)
         db.session.commit()
+        invalidate(user_id, MaternalMedicalHistory)
 
+    except IntegrityError as e:
+        if is_missing_user(e):
+            return jsonify("User not found."), 404
+        return jsonify(f"Error processing request: {e}"), 500
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
 
-    return jsonify({
-        "id": new_maternal_medical_history.id,
-        "user_id": new_maternal_medical_history.user_id,
-        "gestational_age": new_maternal_medical_history.gestational_age,
-        "anticipated_delivery_date": new_maternal_medical_history.anticipated_delivery_date,
-        "planned_mode_delivery": new_maternal_medical_history.planned_mode_delivery,
-        "actual_mode_delivery": new_maternal_medical_history.actual_mode_delivery,
-        "attended_postpartum_visit": new_maternal_medical_history.attended_postpartum_visit,
-        "postpartum_visit_location": new_maternal_medical_history.postpartum_visit_location,
-        "postpartum_visit_date": new_maternal_medical_history.postpartum_visit_date,
-        "total_num_pregnancies": new_maternal_medical_history.total_num_pregnancies,
-        "total_num_live_births": new_maternal_medical_history.total_num_live_births,
-        "total_num_children_with_mother": new_maternal_medical_history.total_num_children_with_mother,
-        "prior_complications": new_maternal_medical_history.prior_complications,
-        "med_problems_diagnosis": new_maternal_medical_history.med_problems_diagnosis,
-        "current_medication_list": new_maternal_medical_history.current_medication_list,
-        "notes": new_maternal_medical_history.notes,
-        "date_created": new_maternal_medical_history.date_created,
-        "date_last_modified": new_maternal_medical_history.date_last_modified
-    }), 201
+    return jsonify(serialize(MaternalMedicalHistory, new_maternal_medical_history)), 201
 
 @medical_history_bp.route('/get_maternal_medical_history', methods = ['GET'])
 @medical_history_bp.route('/get_maternal_medical_history/<id>', methods = ['GET'])
 @jwt_required()
+@conditional_response(MaternalMedicalHistory)
+@cached_response(MaternalMedicalHistory)
 def get_medical_history(id=None):
     """
         Get a maternal_medical_history record
         
+    Query Parameters:
+        - fields (str) (optional): Comma separated column names, only these (and id) are loaded and returned.
+        - limit (int) (optional, list only): Page size. When limit or cursor is set, returns { data, next_cursor }.
+        - cursor (str) (optional, list only): The next_cursor from the previous page.
+        - view (str) (optional, list only): 'summary' returns only id, anticipated_delivery_date and the timestamps of each record.
+    
     Returns:
         - If successful, returns the results of a user's maternal medical history form.
         - If the medical history does not exist, returns a message with the error code 400.
@@ -127,72 +122,35 @@ def get_medical_history(id=None):
     user_id = get_jwt_identity()
     
     try:
-        user = db.session.query(User).filter_by(id=user_id).first()
+        fields = get_fields(MaternalMedicalHistory)
 
-        if not user:
-            return jsonify("User not found."), 404
-        
         if id:
-            maternal_medical_history = db.session.query(MaternalMedicalHistory).filter_by(user_id=user_id, id=id).first()
+            maternal_medical_history = db.session.query(MaternalMedicalHistory).options(*load_fields(MaternalMedicalHistory, fields)).filter_by(user_id=user_id, id=id).first()
             
             if(not maternal_medical_history):
                 return jsonify("Invalid maternal_medical_history id"), 400
 
-            return jsonify({
-                "id": maternal_medical_history.id,
-                "user_id": maternal_medical_history.user_id,
-                "gestational_age": maternal_medical_history.gestational_age,
-                "anticipated_delivery_date": maternal_medical_history.anticipated_delivery_date,
-                "planned_mode_delivery": maternal_medical_history.planned_mode_delivery,
-                "actual_mode_delivery": maternal_medical_history.actual_mode_delivery,
-                "attended_postpartum_visit": maternal_medical_history.attended_postpartum_visit,
-                "postpartum_visit_location": maternal_medical_history.postpartum_visit_location,
-                "postpartum_visit_date": maternal_medical_history.postpartum_visit_date,
-                "total_num_pregnancies": maternal_medical_history.total_num_pregnancies,
-                "total_num_live_births": maternal_medical_history.total_num_live_births,
-                "total_num_children_with_mother": maternal_medical_history.total_num_children_with_mother,
-                "prior_complications": maternal_medical_history.prior_complications,
-                "med_problems_diagnosis": maternal_medical_history.med_problems_diagnosis,
-                "current_medication_list": maternal_medical_history.current_medication_list,
-                "notes": maternal_medical_history.notes,
-                "date_created": maternal_medical_history.date_created,
-                "date_last_modified": maternal_medical_history.date_last_modified
-            }), 200
+            return jsonify(serialize(MaternalMedicalHistory, maternal_medical_history, fields)), 200
             
         else:
-            maternal_medical_history = db.session.query(MaternalMedicalHistory).filter_by(user_id=user_id).all()
-
-            if not maternal_medical_history:
-                return jsonify([]), 200
-
-            maternal_medical_history_list = [{
-                "id": record.id,
-                "user_id": record.user_id,
-                "gestational_age": record.gestational_age,
-                "anticipated_delivery_date": record.anticipated_delivery_date,
-                "planned_mode_delivery": record.planned_mode_delivery,
-                "actual_mode_delivery": record.actual_mode_delivery,
-                "attended_postpartum_visit": record.attended_postpartum_visit,
-                "postpartum_visit_location": record.postpartum_visit_location,
-                "postpartum_visit_date": record.postpartum_visit_date,
-                "total_num_pregnancies": record.total_num_pregnancies,
-                "total_num_live_births": record.total_num_live_births,
-                "total_num_children_with_mother": record.total_num_children_with_mother,
-                "prior_complications": record.prior_complications,
-                "med_problems_diagnosis": record.med_problems_diagnosis,
-                "current_medication_list": record.current_medication_list,
-                "notes": record.notes,
-                "date_created": record.date_created,
-                "date_last_modified": record.date_last_modified
-            } for record in maternal_medical_history]
-
-            return jsonify(maternal_medical_history_list), 200
+            query = db.session.query(MaternalMedicalHistory).filter_by(user_id=user_id)
+
+            if is_summary_view():
+                return summary_response(query, MaternalMedicalHistory, MaternalMedicalHistory.anticipated_delivery_date), 200
+
+            if fields:
+                return fields_response(query, MaternalMedicalHistory, fields), 200
+
+            return json_list_response(query, MaternalMedicalHistory), 200
             
+    except QueryParameterError as e:
+        return jsonify(f"{e}"), 400
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
 
 @medical_history_bp.route('/update_maternal_medical_history/<id>', methods=['PUT'])
 @jwt_required()
+@validated(MaternalMedicalHistory, defaults=False)
 def update_medical_history(id):
     """
     Updates a maternal_medical_history record. 
@@ -224,6 +182,7 @@ def update_medical_history(id):
     Returns:
         - If successful, updates and returns a user's maternal_medical_history form.
         - If there is no medical history in the database, returns a message with error 400.
+        - If a required field is missing or a field has the wrong type, returns error code 422.
         - If there is an unexpected error, returns a JSON error message with the error code 500.
     """
     data = request.get_json()
@@ -246,51 +205,36 @@ def update_medical_history(id):
     notes = data.get('notes')
 
     try:
-        maternal_medical_history = db.session.query(
-            MaternalMedicalHistory).filter_by(user_id=user_id, id=id).first()
+        maternal_medical_history = update_record(
+            MaternalMedicalHistory,
+            user_id,
+            id,
+            gestational_age=gestational_age,
+            anticipated_delivery_date=anticipated_delivery_date,
+            planned_mode_delivery=planned_mode_delivery,
+            actual_mode_delivery=actual_mode_delivery,
+            attended_postpartum_visit=attended_postpartum_visit,
+            postpartum_visit_location=postpartum_visit_location,
+            postpartum_visit_date=postpartum_visit_date,
+            total_num_pregnancies=total_num_pregnancies,
+            total_num_live_births=total_num_live_births,
+            total_num_children_with_mother=total_num_children_with_mother,
+            prior_complications=prior_complications,
+            med_problems_diagnosis=med_problems_diagnosis,
+            current_medication_list=current_medication_list,
+            notes=notes,
+            date_last_modified=datetime.now(timezone.utc)
+        )
 
         if not maternal_medical_history:
             return jsonify("Maternal medical history does not exist."), 400
 
-        maternal_medical_history.gestational_age = gestational_age
-        maternal_medical_history.anticipated_delivery_date = anticipated_delivery_date
-        maternal_medical_history.planned_mode_delivery = planned_mode_delivery
-        maternal_medical_history.actual_mode_delivery = actual_mode_delivery
-        maternal_medical_history.attended_postpartum_visit = attended_postpartum_visit
-        maternal_medical_history.postpartum_visit_location = postpartum_visit_location
-        maternal_medical_history.postpartum_visit_date = postpartum_visit_date
-        maternal_medical_history.total_num_pregnancies = total_num_pregnancies
-        maternal_medical_history.total_num_live_births = total_num_live_births
-        maternal_medical_history.total_num_children_with_mother = total_num_children_with_mother
-        maternal_medical_history.prior_complications = prior_complications
-        maternal_medical_history.med_problems_diagnosis = med_problems_diagnosis
-        maternal_medical_history.current_medication_list = current_medication_list
-        maternal_medical_history.notes = notes
-        maternal_medical_history.date_last_modified = datetime.now(timezone.utc)
         db.session.commit()
+        invalidate(user_id, MaternalMedicalHistory)
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
 
-    return jsonify({
-        "id": maternal_medical_history.id,
-        "user_id": maternal_medical_history.user_id,
-        "gestational_age": maternal_medical_history.gestational_age,
-        "anticipated_delivery_date": maternal_medical_history.anticipated_delivery_date,
-        "planned_mode_delivery": maternal_medical_history.planned_mode_delivery,
-        "actual_mode_delivery": maternal_medical_history.actual_mode_delivery,
-        "attended_postpartum_visit": maternal_medical_history.attended_postpartum_visit,
-        "postpartum_visit_location": maternal_medical_history.postpartum_visit_location,
-        "postpartum_visit_date": maternal_medical_history.postpartum_visit_date,
-        "total_num_pregnancies": maternal_medical_history.total_num_pregnancies,
-        "total_num_live_births": maternal_medical_history.total_num_live_births,
-        "total_num_children_with_mother": maternal_medical_history.total_num_children_with_mother,
-        "prior_complications": maternal_medical_history.prior_complications,
-        "med_problems_diagnosis": maternal_medical_history.med_problems_diagnosis,
-        "current_medication_list": maternal_medical_history.current_medication_list,
-        "notes": maternal_medical_history.notes,
-        "date_created": maternal_medical_history.date_created,
-        "date_last_modified": maternal_medical_history.date_last_modified
-    })
+    return jsonify(serialize(MaternalMedicalHistory, maternal_medical_history))
 
 
 """
@@ -324,14 +268,13 @@ def delete_medical_history(id):
     user_id = get_jwt_identity()
     
     try:
-        maternal_medical_history = db.session.query(
-            MaternalMedicalHistory).filter_by(user_id=user_id, id=id).first()
+        maternal_medical_history = delete_record(MaternalMedicalHistory, user_id, id)
 
         if not maternal_medical_history:
             return jsonify('Maternal medical history does not exist.'), 400
 
-        db.session.delete(maternal_medical_history)
         db.session.commit()
+        invalidate(user_id, MaternalMedicalHistory)
 
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
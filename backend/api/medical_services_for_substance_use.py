@@ -1,12 +1,18 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from database import MedicalServicesForSubstanceUse, db, User
+from database import MedicalServicesForSubstanceUse, db
+from response_cache import cached_response, invalidate
+from serializers import serialize
+from validators import validated
+from api.utils import QueryParameterError, conditional_response, insert_record, update_record, delete_record, is_missing_user, json_list_response, is_summary_view, summary_response, get_fields, load_fields, fields_response
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timezone
 
 medical_services_for_substance_use_bp = Blueprint('medical_services_for_substance_use', __name__)
 
 @medical_services_for_substance_use_bp.route('/add_medical_services_for_substance_use', methods = ['POST'])
 @jwt_required()
+@validated(MedicalServicesForSubstanceUse)
 def add_medical_services_for_substance_use():
     """
     Creates a medical_services_for_substance_use record for a user.
@@ -31,6 +37,7 @@ def add_medical_services_for_substance_use():
     Returns:
         - If successful, adds and returns the user's new medical_services_for_substance_use record.
         - If medical_services_for_substance_use record for this user already exists, returns error message with error code 400.
+        - If a required field is missing or a field has the wrong type, returns error code 422.
         - If there is an unexpected error, returns error message with error code 500.
     """
     data = request.get_json()
@@ -49,12 +56,8 @@ def add_medical_services_for_substance_use():
     
     try:
         
-        user = db.session.query(User).filter_by(id=user_id).first()
-        
-        if not user:
-            return jsonify("User not found."), 404
-        
-        new_medical_services_for_substance_use = MedicalServicesForSubstanceUse(
+        new_medical_services_for_substance_use = insert_record(
+            MedicalServicesForSubstanceUse,
             user_id=user_id,
             mat_engaged=mat_engaged,
             date_used_mat=date_used_mat,
@@ -68,32 +71,23 @@ def add_medical_services_for_substance_use():
             date_created=datetime.now(timezone.utc),
             date_last_modified=datetime.now(timezone.utc)
         )
-        
-        db.session.add(new_medical_services_for_substance_use)
         db.session.commit()
+        invalidate(user_id, MedicalServicesForSubstanceUse)
         
+    except IntegrityError as e:
+        if is_missing_user(e):
+            return jsonify("User not found."), 404
+        return jsonify(f"Error processing request: {e}"), 500
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
 
-    return jsonify({
-        "id": new_medical_services_for_substance_use.id,
-        "user_id": new_medical_services_for_substance_use.user_id,
-        "mat_engaged": new_medical_services_for_substance_use.mat_engaged,
-        "date_used_mat": new_medical_services_for_substance_use.date_used_mat,
-        "medications": new_medical_services_for_substance_use.medications,
-        "mat_clinic_name": new_medical_services_for_substance_use.mat_clinic_name,
-        "mat_clinic_phone": new_medical_services_for_substance_use.mat_clinic_phone,
-        "used_addiction_medicine_services": new_medical_services_for_substance_use.used_addiction_medicine_services,
-        "date_used_medicine_service": new_medical_services_for_substance_use.date_used_medicine_service,
-        "addiction_medicine_clinic": new_medical_services_for_substance_use.addiction_medicine_clinic,
-        "addiction_medicine_clinic_phone": new_medical_services_for_substance_use.addiction_medicine_clinic_phone,
-        "date_created": new_medical_services_for_substance_use.date_created,
-        "date_last_modified": new_medical_services_for_substance_use.date_last_modified
-    }), 201
+    return jsonify(serialize(MedicalServicesForSubstanceUse, new_medical_services_for_substance_use)), 201
     
 @medical_services_for_substance_use_bp.route('/get_medical_services_for_substance_use', methods = ['GET'])
 @medical_services_for_substance_use_bp.route('/get_medical_services_for_substance_use/<id>', methods = ['GET'])
 @jwt_required()
+@conditional_response(MedicalServicesForSubstanceUse)
+@cached_response(MedicalServicesForSubstanceUse)
 def get_medical_services_for_substance_use(id=None):
     """
     Gets a medical_services_for_substance_use record for a user.
@@ -101,6 +95,12 @@ def get_medical_services_for_substance_use(id=None):
     Request JSON Parameters:
         - user_id (string)
     
+    Query Parameters:
+        - fields (str) (optional): Comma separated column names, only these (and id) are loaded and returned.
+        - limit (int) (optional, list only): Page size. When limit or cursor is set, returns { data, next_cursor }.
+        - cursor (str) (optional, list only): The next_cursor from the previous page.
+        - view (str) (optional, list only): 'summary' returns only id, mat_clinic_name and the timestamps of each record.
+    
     Returns:
         - If successful, gets and returns the user's new medical_services_for_substance_use record.
         - If medical_services_for_substance_use record for this user does not exist, returns error message with error code 404.
@@ -109,62 +109,35 @@ def get_medical_services_for_substance_use(id=None):
     user_id = get_jwt_identity()
     
     try:
-        user = db.session.query(User).filter_by(id=user_id).first()
+        fields = get_fields(MedicalServicesForSubstanceUse)
 
-        if not user:
-            return jsonify("User not found."), 404
-        
         if id:
-            medical_services_for_substance_use = db.session.query(MedicalServicesForSubstanceUse).filter_by(user_id=user_id, id=id).first()
+            medical_services_for_substance_use = db.session.query(MedicalServicesForSubstanceUse).options(*load_fields(MedicalServicesForSubstanceUse, fields)).filter_by(user_id=user_id, id=id).first()
 
             if(not medical_services_for_substance_use):
                 return jsonify("Invalid medical_services_for_substance_use id"), 400
-            
-            return jsonify({
-                "id":  medical_services_for_substance_use.id,
-                "user_id":  medical_services_for_substance_use.user_id,
-                "mat_engaged":  medical_services_for_substance_use.mat_engaged,
-                "date_used_mat":  medical_services_for_substance_use.date_used_mat,
-                "medications":  medical_services_for_substance_use.medications,
-                "mat_clinic_name":  medical_services_for_substance_use.mat_clinic_name,
-                "mat_clinic_phone": medical_services_for_substance_use.mat_clinic_phone,
-                "used_addiction_medicine_services": medical_services_for_substance_use.used_addiction_medicine_services,
-                "date_used_medicine_service": medical_services_for_substance_use.date_used_medicine_service,
-                "addiction_medicine_clinic": medical_services_for_substance_use.addiction_medicine_clinic,
-                "addiction_medicine_clinic_phone": medical_services_for_substance_use.addiction_medicine_clinic_phone,
-                "date_created": medical_services_for_substance_use.date_created,
-                "date_last_modified": medical_services_for_substance_use.date_last_modified
-            }), 200
+
+            return jsonify(serialize(MedicalServicesForSubstanceUse, medical_services_for_substance_use, fields)), 200
             
         else:
-            medical_services_for_substance_use = db.session.query(MedicalServicesForSubstanceUse).filter_by(user_id=user_id).all()
+            query = db.session.query(MedicalServicesForSubstanceUse).filter_by(user_id=user_id)
 
-            if not medical_services_for_substance_use:
-                return jsonify([]), 200
+            if is_summary_view():
+                return summary_response(query, MedicalServicesForSubstanceUse, MedicalServicesForSubstanceUse.mat_clinic_name), 200
 
-            medical_services_for_substance_use_list = [{
-                "id":  record.id,
-                "user_id":  record.user_id,
-                "mat_engaged":  record.mat_engaged,
-                "date_used_mat":  record.date_used_mat,
-                "medications":  record.medications,
-                "mat_clinic_name":  record.mat_clinic_name,
-                "mat_clinic_phone": record.mat_clinic_phone,
-                "used_addiction_medicine_services": record.used_addiction_medicine_services,
-                "date_used_medicine_service": record.date_used_medicine_service,
-                "addiction_medicine_clinic": record.addiction_medicine_clinic,
-                "addiction_medicine_clinic_phone": record.addiction_medicine_clinic_phone,
-                "date_created": record.date_created,
-                "date_last_modified": record.date_last_modified
-            } for record in medical_services_for_substance_use]
+            if fields:
+                return fields_response(query, MedicalServicesForSubstanceUse, fields), 200
 
-            return jsonify(medical_services_for_substance_use_list), 200
+            return json_list_response(query, MedicalServicesForSubstanceUse), 200
             
+    except QueryParameterError as e:
+        return jsonify(f"{e}"), 400
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
     
 @medical_services_for_substance_use_bp.route('/update_medical_services_for_substance_use/<id>', methods = ['PUT'])
 @jwt_required()
+@validated(MedicalServicesForSubstanceUse, defaults=False)
 def update_medical_services_for_substance_use(id):
     """
     Updates a medical_services_for_substance_use record for a user.
@@ -189,6 +162,7 @@ def update_medical_services_for_substance_use(id):
     Returns:
         - If successful, adds and returns the user's new medical_services_for_substance_use record.
         - If medical_services_for_substance_use record for this user already exists, returns error message with error code 404.
+        - If a required field is missing or a field has the wrong type, returns error code 422.
         - If there is an unexpected error, returns error message with error code 500.
     """
     data=request.get_json()
@@ -206,41 +180,32 @@ def update_medical_services_for_substance_use(id):
     addiction_medicine_clinic_phone = data.get('addiction_medicine_clinic_phone')
     
     try:
-        medical_services_for_substance_use = db.session.query(MedicalServicesForSubstanceUse).filter_by(user_id=user_id, id=id).first()
-        
+        medical_services_for_substance_use = update_record(
+            MedicalServicesForSubstanceUse,
+            user_id,
+            id,
+            mat_engaged=mat_engaged,
+            date_used_mat=date_used_mat,
+            medications=medications,
+            mat_clinic_name=mat_clinic_name,
+            mat_clinic_phone=mat_clinic_phone,
+            used_addiction_medicine_services=used_addiction_medicine_services,
+            date_used_medicine_service=date_used_medicine_service,
+            addiction_medicine_clinic=addiction_medicine_clinic,
+            addiction_medicine_clinic_phone=addiction_medicine_clinic_phone,
+            date_last_modified=datetime.now(timezone.utc)
+        )
+
         if not medical_services_for_substance_use:
             return jsonify("Medical Services for Substance Use information does not exist for this user."), 404
-        
-        medical_services_for_substance_use.mat_engaged = mat_engaged
-        medical_services_for_substance_use.date_used_mat = date_used_mat
-        medical_services_for_substance_use.medications = medications
-        medical_services_for_substance_use.mat_clinic_name = mat_clinic_name
-        medical_services_for_substance_use.mat_clinic_phone = mat_clinic_phone
-        medical_services_for_substance_use.used_addiction_medicine_services = used_addiction_medicine_services
-        medical_services_for_substance_use.date_used_medicine_service = date_used_medicine_service
-        medical_services_for_substance_use.addiction_medicine_clinic = addiction_medicine_clinic
-        medical_services_for_substance_use.addiction_medicine_clinic_phone = addiction_medicine_clinic_phone
-        medical_services_for_substance_use.date_last_modified=datetime.now(timezone.utc)
+
         db.session.commit()
+        invalidate(user_id, MedicalServicesForSubstanceUse)
         
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
     
-    return jsonify({
-        "id":  medical_services_for_substance_use.id,
-        "user_id":  medical_services_for_substance_use.user_id,
-        "mat_engaged":  medical_services_for_substance_use.mat_engaged,
-        "date_used_mat":  medical_services_for_substance_use.date_used_mat,
-        "medications":  medical_services_for_substance_use.medications,
-        "mat_clinic_name":  medical_services_for_substance_use.mat_clinic_name,
-        "mat_clinic_phone": medical_services_for_substance_use.mat_clinic_phone,
-        "used_addiction_medicine_services": medical_services_for_substance_use.used_addiction_medicine_services,
-        "date_used_medicine_service": medical_services_for_substance_use.date_used_medicine_service,
-        "addiction_medicine_clinic": medical_services_for_substance_use.addiction_medicine_clinic,
-        "addiction_medicine_clinic_phone": medical_services_for_substance_use.addiction_medicine_clinic_phone,
-        "date_created": medical_services_for_substance_use.date_created,
-        "date_last_modified": medical_services_for_substance_use.date_last_modified
-    }), 200
+    return jsonify(serialize(MedicalServicesForSubstanceUse, medical_services_for_substance_use)), 200
     
 @medical_services_for_substance_use_bp.route('/delete_medical_services_for_substance_use/<id>', methods = ['DELETE'])
 @jwt_required()
@@ -260,13 +225,13 @@ def delete_medical_services_for_substance_use(id):
 
     try:
 
-        medical_services_for_substance_use = MedicalServicesForSubstanceUse.query.filter_by(user_id=user_id, id=id).first()
-        
+        medical_services_for_substance_use = delete_record(MedicalServicesForSubstanceUse, user_id, id)
+
         if not medical_services_for_substance_use:
             return jsonify("Medical Services for Substance Use information does not exist for this user."), 404
-        
-        db.session.delete(medical_services_for_substance_use)
+
         db.session.commit()
+        invalidate(user_id, MedicalServicesForSubstanceUse)
     
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
@@ -0,0 +1,23 @@
+from flask import Blueprint, jsonify
+import changes
+import response_cache
+import revocation
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Gets the counters of the worker that handles the request. Each gunicorn worker keeps its own, so a scraper sees
+    one worker per request.
+
+    Returns:
+        - The worker's revocation counters, including the Bloom filter's configured and estimated false positive rates.
+        - The worker's response cache hits, misses, evictions and size in bytes.
+        - How many careplan_changes notifications the worker's listener handled.
+    """
+    return jsonify({
+        'revocation': revocation.metrics(),
+        'response_cache': response_cache.cache.metrics(),
+        'changes': changes.stats
+    }), 200
@@ -1,12 +1,18 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from database import User, db, PsychiatricHistory
+from database import db, PsychiatricHistory
+from response_cache import cached_response, invalidate
+from serializers import serialize
+from validators import validated
+from api.utils import QueryParameterError, conditional_response, insert_record, update_record, delete_record, is_missing_user, json_list_response, is_summary_view, summary_response, get_fields, load_fields, fields_response
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timezone
 
 psychiatric_history_bp = Blueprint('psychiatric_history', __name__)
 
 @psychiatric_history_bp.route('/add_psychiatric_history', methods = ['POST'])
 @jwt_required()
+@validated(PsychiatricHistory)
 def add_psychiatric_history():
     """
     Adds a record of the user's psychiatric history to the User table in the db.
@@ -27,6 +33,7 @@ def add_psychiatric_history():
     Returns:
         - If successful, adds and returns the user's psychiatric history.
         - If the user doesn't exist or user's psychiatric history already exists, returns error code 400.
+        - If a required field is missing or a field has the wrong type, returns error code 422.
         - If there is an error processing the request, returns error code 500.
     """
     data = request.get_json()
@@ -35,35 +42,29 @@ def add_psychiatric_history():
     notes = data.get('notes')
     
     try:
-        user = User.query.filter_by(id=user_id).first()
-        
-        if not user:
-            return jsonify("This user does not exist."), 400
-        
-        new_pscyhiatric_history = PsychiatricHistory(
+        new_pscyhiatric_history = insert_record(
+            PsychiatricHistory,
             user_id=user_id,
             diagnosis=diagnosis,
             notes=notes,
             date_created=datetime.now(timezone.utc),
             date_last_modified=datetime.now(timezone.utc)
         )
-        db.session.add(new_pscyhiatric_history)
         db.session.commit()
+        invalidate(user_id, PsychiatricHistory)
 
+    except IntegrityError as e:
+        if is_missing_user(e):
+            return jsonify("User not found."), 404
+        return jsonify(f"Error processing request: {e}"), 500
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
     
-    return jsonify({
-        "id": new_pscyhiatric_history.id, 
-        "user_id": new_pscyhiatric_history.user_id,
-        "diagnosis": new_pscyhiatric_history.diagnosis,
-        "notes": new_pscyhiatric_history.notes,
-        "date_created": new_pscyhiatric_history.date_created,
-        "date_last_modified": new_pscyhiatric_history.date_last_modified
-    }), 201
+    return jsonify(serialize(PsychiatricHistory, new_pscyhiatric_history)), 201
 
 @psychiatric_history_bp.route('/update_psychiatric_history/<id>', methods = ['PUT'])
 @jwt_required()
+@validated(PsychiatricHistory, defaults=False)
 def update_psychiatric_history(id):
     """
     Updates a record of the user's psychiatric history to the User table in the db.
@@ -84,6 +85,7 @@ def update_psychiatric_history(id):
     Returns:
         - If successful, updates and returns the user's psychiatric history.
         - If the user doesn't exist, returns error code 400.
+        - If a required field is missing or a field has the wrong type, returns error code 422.
         - If there is an error processing the request, returns error code 500.
     """
     data = request.get_json()
@@ -92,31 +94,31 @@ def update_psychiatric_history(id):
     notes = data.get('notes')
     
     try:
-        psychiatric_history = db.session.query(PsychiatricHistory).filter_by(user_id=user_id, id=id).first()
+        psychiatric_history = update_record(
+            PsychiatricHistory,
+            user_id,
+            id,
+            diagnosis=diagnosis,
+            notes=notes,
+            date_last_modified=datetime.now(timezone.utc)
+        )
 
         if not psychiatric_history:
             return jsonify("psychiatric_history record does not exist."), 400
 
-        psychiatric_history.diagnosis = diagnosis
-        psychiatric_history.notes = notes
-        psychiatric_history.date_last_modified=datetime.now(timezone.utc)
         db.session.commit()
+        invalidate(user_id, PsychiatricHistory)
 
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
     
-    return jsonify({
-        "id": psychiatric_history.id, 
-        "user_id": psychiatric_history.user_id,
-        "diagnosis": psychiatric_history.diagnosis,
-        "notes": psychiatric_history.notes,
-        "date_created": psychiatric_history.date_created,
-        "date_last_modified": psychiatric_history.date_last_modified
-    }), 200
+    return jsonify(serialize(PsychiatricHistory, psychiatric_history)), 200
     
 @psychiatric_history_bp.route('/get_psychiatric_history', methods = ['GET'])
 @psychiatric_history_bp.route('/get_psychiatric_history/<id>', methods = ['GET'])
 @jwt_required()
+@conditional_response(PsychiatricHistory)
+@cached_response(PsychiatricHistory)
 def get_psychiatric_history(id=None):
     """
     Gets a record of the user's psychiatric history from the User table in the db.
@@ -124,6 +126,12 @@ def get_psychiatric_history(id=None):
     Request JSON Parameters:
         - user_id (str)
     
+    Query Parameters:
+        - fields (str) (optional): Comma separated column names, only these (and id) are loaded and returned.
+        - limit (int) (optional, list only): Page size. When limit or cursor is set, returns { data, next_cursor }.
+        - cursor (str) (optional, list only): The next_cursor from the previous page.
+        - view (str) (optional, list only): 'summary' returns only the id and timestamps of each record.
+    
     Returns:
         - If successful, returns the user's psychiatric history.
         - If the user or the psychiatric history doesn't exist, returns error code 400.
@@ -132,43 +140,29 @@ def get_psychiatric_history(id=None):
     user_id = get_jwt_identity()
     
     try:
-        user = db.session.query(User).filter_by(id=user_id).first()
+        fields = get_fields(PsychiatricHistory)
 
-        if not user:
-            return jsonify("User not found."), 404
-        
         if id:
-            psychiatric_history = db.session.query(PsychiatricHistory).filter_by(user_id=user_id, id=id).first()
+            psychiatric_history = db.session.query(PsychiatricHistory).options(*load_fields(PsychiatricHistory, fields)).filter_by(user_id=user_id, id=id).first()
             
             if(not psychiatric_history):
                 return jsonify("Invalid psychiatric_history id"), 400
 
-            return jsonify({
-                "id": psychiatric_history.id, 
-                "user_id": psychiatric_history.user_id,
-                "diagnosis": psychiatric_history.diagnosis,
-                "notes": psychiatric_history.notes,
-                "date_created": psychiatric_history.date_created,
-                "date_last_modified": psychiatric_history.date_last_modified
-            }), 200
+            return jsonify(serialize(PsychiatricHistory, psychiatric_history, fields)), 200
             
         else:
-            psychiatric_history = db.session.query(PsychiatricHistory).filter_by(user_id=user_id).all()
+            query = db.session.query(PsychiatricHistory).filter_by(user_id=user_id)
 
-            if not psychiatric_history:
-                return jsonify([]), 200
+            if is_summary_view():
+                return summary_response(query, PsychiatricHistory), 200
 
-            psychiatric_history_list = [{
-                "id": record.id, 
-                "user_id": record.user_id,
-                "diagnosis": record.diagnosis,
-                "notes": record.notes,
-                "date_created": record.date_created,
-                "date_last_modified": record.date_last_modified
-            } for record in psychiatric_history]
+            if fields:
+                return fields_response(query, PsychiatricHistory, fields), 200
 
-            return jsonify(psychiatric_history_list), 200
+            return json_list_response(query, PsychiatricHistory), 200
             
+    except QueryParameterError as e:
+        return jsonify(f"{e}"), 400
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
     
@@ -189,13 +183,13 @@ def delete_psychiatric_history(id):
     user_id=get_jwt_identity()
     
     try:
-        psychiatric_history = db.session.query(PsychiatricHistory).filter_by(user_id=user_id, id=id).first()
-                
+        psychiatric_history = delete_record(PsychiatricHistory, user_id, id)
+
         if not psychiatric_history:
             return jsonify("This user does not exist"), 400
 
-        db.session.delete(psychiatric_history)
         db.session.commit()
+        invalidate(user_id, PsychiatricHistory)
     
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
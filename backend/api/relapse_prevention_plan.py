@@ -1,12 +1,18 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from database import RelapsePreventionPlan, db, User
+from database import RelapsePreventionPlan, db
+from response_cache import cached_response, invalidate
+from serializers import serialize
+from validators import validated
+from api.utils import QueryParameterError, conditional_response, insert_record, update_record, delete_record, is_missing_user, json_list_response, is_summary_view, summary_response, get_fields, load_fields, fields_response
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timezone
 
 relapse_prevention_plan_bp = Blueprint('relapse_prevention_plan', __name__)
 
 @relapse_prevention_plan_bp.route('/add_relapse_prevention_plan', methods=['POST'])
 @jwt_required()
+@validated(RelapsePreventionPlan)
 def add_relapse_prevention_plan():
     """
     Creates a relapse_prevention_plan record for the user.
@@ -30,6 +36,7 @@ def add_relapse_prevention_plan():
         - If successful, adds and returns the user's relapse_prevention_plan record.
         - If an invalid user is added, returns error 404.
         - If relapse_prevention_plan record for user already exists, returns error code 400.
+        - If a required field is missing or a field has the wrong type, returns error code 422.
         - If there is an unexpected error, returns error code 500.
     """
     data = request.get_json()
@@ -44,12 +51,8 @@ def add_relapse_prevention_plan():
     comments=data.get('comments')
     
     try: 
-        user = db.session.query(User).filter_by(id=user_id).first()
-        
-        if not user:
-            return("User not found."), 404
-        
-        new_relapse_prevention_plan = RelapsePreventionPlan(
+        new_relapse_prevention_plan = insert_record(
+            RelapsePreventionPlan,
             user_id=user_id,
             three_things_that_trigger_desire_to_use=three_things_that_trigger_desire_to_use,
             three_skills_you_enjoy=three_skills_you_enjoy,
@@ -60,28 +63,21 @@ def add_relapse_prevention_plan():
             date_created=datetime.now(timezone.utc),
             date_last_modified=datetime.now(timezone.utc)
         )
-        
-        db.session.add(new_relapse_prevention_plan)
         db.session.commit()
+        invalidate(user_id, RelapsePreventionPlan)
         
+    except IntegrityError as e:
+        if is_missing_user(e):
+            return jsonify("User not found."), 404
+        return jsonify(f"Error processing request: {e}"), 500
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
     
-    return jsonify ({
-        "id": new_relapse_prevention_plan.id,
-        "user_id": new_relapse_prevention_plan.user_id,
-        "three_things_that_trigger_desire_to_use": new_relapse_prevention_plan.three_things_that_trigger_desire_to_use,
-        "three_skills_you_enjoy": new_relapse_prevention_plan.three_skills_you_enjoy,
-        "three_people_to_talk_to": new_relapse_prevention_plan.three_people_to_talk_to,
-        "safe_caregivers": new_relapse_prevention_plan.safe_caregivers,
-        "have_naloxone": new_relapse_prevention_plan.have_naloxone,
-        "comments": new_relapse_prevention_plan.comments,
-        "date_created": new_relapse_prevention_plan.date_created,
-        "date_last_modified": new_relapse_prevention_plan.date_last_modified
-    }), 201
+    return jsonify (serialize(RelapsePreventionPlan, new_relapse_prevention_plan)), 201
     
 @relapse_prevention_plan_bp.route('/update_relapse_prevention_plan/<id>', methods=['PUT'])
 @jwt_required()
+@validated(RelapsePreventionPlan, defaults=False)
 def update_relapse_prevention_plan(id):
     """
     Updates a relapse_prevention_plan record for the user.
@@ -104,6 +100,7 @@ def update_relapse_prevention_plan(id):
     Returns:
         - If successful, updates and returns the user's relapse_prevention_plan record.
         - If relapse_prevention_plan record for user already exists, returns error code 400.
+        - If a required field is missing or a field has the wrong type, returns error code 422.
         - If there is an unexpected error, returns error code 500.
     """
     data = request.get_json()
@@ -119,40 +116,35 @@ def update_relapse_prevention_plan(id):
     
     try: 
         
-        relapse_prevention_plan=db.session.query(RelapsePreventionPlan).filter_by(user_id=user_id, id=id).first()
-        
+        relapse_prevention_plan = update_record(
+            RelapsePreventionPlan,
+            user_id,
+            id,
+            three_things_that_trigger_desire_to_use=three_things_that_trigger_desire_to_use,
+            three_skills_you_enjoy=three_skills_you_enjoy,
+            three_people_to_talk_to=three_people_to_talk_to,
+            safe_caregivers=safe_caregivers,
+            have_naloxone=have_naloxone,
+            comments=comments,
+            date_last_modified=datetime.now(timezone.utc)
+        )
+
         if not relapse_prevention_plan:
             return jsonify("relapse_prevention_plan record does not exist"), 400
-        
-        relapse_prevention_plan.three_things_that_trigger_desire_to_use=three_things_that_trigger_desire_to_use
-        relapse_prevention_plan.three_skills_you_enjoy=three_skills_you_enjoy
-        relapse_prevention_plan.three_people_to_talk_to=three_people_to_talk_to
-        relapse_prevention_plan.safe_caregivers=safe_caregivers
-        relapse_prevention_plan.have_naloxone=have_naloxone
-        relapse_prevention_plan.comments=comments
-        relapse_prevention_plan.date_last_modified=datetime.now(timezone.utc)
-        
+
         db.session.commit()
+        invalidate(user_id, RelapsePreventionPlan)
         
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
     
-    return jsonify ({
-        "id": relapse_prevention_plan.id,
-        "user_id": relapse_prevention_plan.user_id,
-        "three_things_that_trigger_desire_to_use": relapse_prevention_plan.three_things_that_trigger_desire_to_use,
-        "three_skills_you_enjoy": relapse_prevention_plan.three_skills_you_enjoy,
-        "three_people_to_talk_to": relapse_prevention_plan.three_people_to_talk_to,
-        "safe_caregivers": relapse_prevention_plan.safe_caregivers,
-        "have_naloxone": relapse_prevention_plan.have_naloxone,
-        "comments": relapse_prevention_plan.comments,
-        "date_created": relapse_prevention_plan.date_created,
-        "date_last_modified": relapse_prevention_plan.date_last_modified
-    }), 200
+    return jsonify (serialize(RelapsePreventionPlan, relapse_prevention_plan)), 200
     
 @relapse_prevention_plan_bp.route('/get_relapse_prevention_plan', methods=['GET'])
 @relapse_prevention_plan_bp.route('/get_relapse_prevention_plan/<id>', methods=['GET'])
 @jwt_required()
+@conditional_response(RelapsePreventionPlan)
+@cached_response(RelapsePreventionPlan)
 def get_relapse_prevention_plan(id=None):
     """
     Gets a relapse_prevention_plan record for a user.
@@ -160,6 +152,12 @@ def get_relapse_prevention_plan(id=None):
     Request JSON Parameters:
         - user_id (string)
     
+    Query Parameters:
+        - fields (str) (optional): Comma separated column names, only these (and id) are loaded and returned.
+        - limit (int) (optional, list only): Page size. When limit or cursor is set, returns { data, next_cursor }.
+        - cursor (str) (optional, list only): The next_cursor from the previous page.
+        - view (str) (optional, list only): 'summary' returns only id, have_naloxone and the timestamps of each record.
+    
     Returns:
         - If successful, returns a user's relapse_prevention_plan record.
         - If the relapse_prevention_plan record does not exist in the database, returns a message with the error code 400.
@@ -168,51 +166,29 @@ def get_relapse_prevention_plan(id=None):
     user_id = get_jwt_identity()
     
     try:
-        user = db.session.query(User).filter_by(id=user_id).first()
+        fields = get_fields(RelapsePreventionPlan)
 
-        if not user:
-            return jsonify("User not found."), 404
-        
         if id:
-            relapse_prevention_plan = db.session.query(RelapsePreventionPlan).filter_by(user_id=user_id, id=id).first()
+            relapse_prevention_plan = db.session.query(RelapsePreventionPlan).options(*load_fields(RelapsePreventionPlan, fields)).filter_by(user_id=user_id, id=id).first()
             
             if(not relapse_prevention_plan):
                 return jsonify("Invalid relapse_prevention_plan id"), 400
 
-            return jsonify({
-                "id": relapse_prevention_plan.id,
-                "user_id": relapse_prevention_plan.user_id,
-                "three_things_that_trigger_desire_to_use": relapse_prevention_plan.three_things_that_trigger_desire_to_use,
-                "three_skills_you_enjoy": relapse_prevention_plan.three_skills_you_enjoy,
-                "three_people_to_talk_to": relapse_prevention_plan.three_people_to_talk_to,
-                "safe_caregivers": relapse_prevention_plan.safe_caregivers,
-                "have_naloxone": relapse_prevention_plan.have_naloxone,
-                "comments": relapse_prevention_plan.comments,
-                "date_created": relapse_prevention_plan.date_created,
-                "date_last_modified": relapse_prevention_plan.date_last_modified
-            }), 200
+            return jsonify(serialize(RelapsePreventionPlan, relapse_prevention_plan, fields)), 200
             
         else:
-            relapse_prevention_plan = db.session.query(RelapsePreventionPlan).filter_by(user_id=user_id).all()
+            query = db.session.query(RelapsePreventionPlan).filter_by(user_id=user_id)
 
-            if not relapse_prevention_plan:
-                return jsonify([]), 200
+            if is_summary_view():
+                return summary_response(query, RelapsePreventionPlan, RelapsePreventionPlan.have_naloxone), 200
 
-            relapse_prevention_plan_list = [{
-                "id": record.id,
-                "user_id": record.user_id,
-                "three_things_that_trigger_desire_to_use": record.three_things_that_trigger_desire_to_use,
-                "three_skills_you_enjoy": record.three_skills_you_enjoy,
-                "three_people_to_talk_to": record.three_people_to_talk_to,
-                "safe_caregivers": record.safe_caregivers,
-                "have_naloxone": record.have_naloxone,
-                "comments": record.comments,
-                "date_created": record.date_created,
-                "date_last_modified": record.date_last_modified
-            } for record in relapse_prevention_plan]
+            if fields:
+                return fields_response(query, RelapsePreventionPlan, fields), 200
 
-            return jsonify(relapse_prevention_plan_list), 200
+            return json_list_response(query, RelapsePreventionPlan), 200
             
+    except QueryParameterError as e:
+        return jsonify(f"{e}"), 400
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
     
@@ -233,13 +209,13 @@ def delete_relapse_prevention_plan(id):
     user_id = get_jwt_identity()
     
     try:
-        relapse_prevention_plan = db.session.query(RelapsePreventionPlan).filter_by(user_id=user_id, id=id).first()
-        
+        relapse_prevention_plan = delete_record(RelapsePreventionPlan, user_id, id)
+
         if not relapse_prevention_plan:
             return jsonify('relapse_prevention_plan record does not exist for this user.'), 400
 
-        db.session.delete(relapse_prevention_plan)
         db.session.commit()
+        invalidate(user_id, RelapsePreventionPlan)
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
 
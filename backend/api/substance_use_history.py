@@ -1,12 +1,18 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from database import User, db, SubstanceUseHistory
+from database import db, SubstanceUseHistory
+from response_cache import cached_response, invalidate
+from serializers import serialize
+from validators import validated
+from api.utils import QueryParameterError, conditional_response, insert_record, update_record, delete_record, is_missing_user, json_list_response, is_summary_view, summary_response, get_fields, load_fields, fields_response
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timezone
 
 substance_use_history_bp = Blueprint('substance_use_history', __name__)
 
 @substance_use_history_bp.route('/add_substance_use_history', methods = ['POST'])
 @jwt_required()
+@validated(SubstanceUseHistory)
 def add_substance_use_history():
     """  
     Adds a record of substance_use_history for a user to the db.
@@ -36,6 +42,7 @@ def add_substance_use_history():
     Returns:
         - If successful, adds and returns the user's new substance_use_history record.
         - If the substance_use_history record from this user already exists in the database, returns error messsage with error code 400.
+        - If a required field is missing or a field has the wrong type, returns error code 422.
         - If there is an unexpected error, returns error message with the error code 500.
     """
     data = request.get_json()
@@ -56,12 +63,8 @@ def add_substance_use_history():
     
     try:
         
-        user = db.session.query(User).filter_by(id=user_id).first()
-        
-        if not user:
-            return jsonify("User not found."), 404
-        
-        new_substance_use_history = SubstanceUseHistory(
+        new_substance_use_history = insert_record(
+            SubstanceUseHistory,
             user_id=user_id,
             alcohol=alcohol,
             benzodiazepines=benzodiazepines,
@@ -77,32 +80,20 @@ def add_substance_use_history():
             date_created=datetime.now(timezone.utc),
             date_last_modified=datetime.now(timezone.utc)
         )
-        
-        db.session.add(new_substance_use_history)
         db.session.commit()
+        invalidate(user_id, SubstanceUseHistory)
+    except IntegrityError as e:
+        if is_missing_user(e):
+            return jsonify("User not found."), 404
+        return jsonify(f"Error processing request: {e}"), 500
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
     
-    return jsonify({
-        "id": new_substance_use_history.id,
-        "user_id": new_substance_use_history.user_id,
-        "alcohol": new_substance_use_history.alcohol,
-        "benzodiazepines": new_substance_use_history.benzodiazepines,
-        "cocaine": new_substance_use_history.cocaine,
-        "heroin": new_substance_use_history.heroin,
-        "kush": new_substance_use_history.kush,
-        "marijuana": new_substance_use_history.marijuana,
-        "methamphetamine": new_substance_use_history.methamphetamine,
-        "prescription_drugs": new_substance_use_history.prescription_drugs,
-        "tobacco": new_substance_use_history.tobacco,
-        "other_drugs": new_substance_use_history.other_drugs,
-        "notes": new_substance_use_history.notes,
-        "date_created": new_substance_use_history.date_created,
-        "date_last_modified": new_substance_use_history.date_last_modified
-    }), 201
+    return jsonify(serialize(SubstanceUseHistory, new_substance_use_history)), 201
     
 @substance_use_history_bp.route('/update_substance_use_history/<id>', methods = ['PUT'])
 @jwt_required()
+@validated(SubstanceUseHistory, defaults=False)
 def update_substance_use_history(id):
     """  
     Updates a record of substance_use_history for a user to the db.
@@ -133,6 +124,7 @@ def update_substance_use_history(id):
     Returns:
         - If successful, updates and returns the user's new substance_use_history record.
         - If the substance_use_history record from this user doesn't exist in the database, returns error messsage with error code 400.
+        - If a required field is missing or a field has the wrong type, returns error code 422.
         - If there is an unexpected error, returns error message with the error code 500.
     """
     data = request.get_json()
@@ -152,52 +144,49 @@ def update_substance_use_history(id):
     notes = data.get('notes')
     
     try:
-        substance_use_history = db.session.query(SubstanceUseHistory).filter_by(user_id=user_id, id=id).first()
+        substance_use_history = update_record(
+            SubstanceUseHistory,
+            user_id,
+            id,
+            alcohol=alcohol,
+            benzodiazepines=benzodiazepines,
+            cocaine=cocaine,
+            heroin=heroin,
+            kush=kush,
+            marijuana=marijuana,
+            methamphetamine=methamphetamine,
+            prescription_drugs=prescription_drugs,
+            tobacco=tobacco,
+            other_drugs=other_drugs,
+            notes=notes,
+            date_last_modified=datetime.now(timezone.utc)
+        )
 
         if not substance_use_history:
             return jsonify("substance_use_history record for this user does not exist."), 400
-        
-        substance_use_history.alcohol=alcohol
-        substance_use_history.benzodiazepines=benzodiazepines
-        substance_use_history.cocaine=cocaine
-        substance_use_history.heroin=heroin
-        substance_use_history.kush=kush
-        substance_use_history.marijuana=marijuana
-        substance_use_history.methamphetamine=methamphetamine
-        substance_use_history.prescription_drugs=prescription_drugs
-        substance_use_history.tobacco=tobacco
-        substance_use_history.other_drugs=other_drugs
-        substance_use_history.notes=notes
-        substance_use_history.date_last_modified=datetime.now(timezone.utc)
+
         db.session.commit()
+        invalidate(user_id, SubstanceUseHistory)
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
     
-    return jsonify({
-        "id": substance_use_history.id,
-        "user_id": substance_use_history.user_id,
-        "alcohol": substance_use_history.alcohol,
-        "benzodiazepines": substance_use_history.benzodiazepines,
-        "cocaine": substance_use_history.cocaine,
-        "heroin": substance_use_history.heroin,
-        "kush": substance_use_history.kush,
-        "marijuana": substance_use_history.marijuana,
-        "methamphetamine": substance_use_history.methamphetamine,
-        "prescription_drugs": substance_use_history.prescription_drugs,
-        "tobacco": substance_use_history.tobacco,
-        "other_drugs": substance_use_history.other_drugs,
-        "notes": substance_use_history.notes,
-        "date_created": substance_use_history.date_created,
-        "date_last_modified": substance_use_history.date_last_modified
-    }), 200
+    return jsonify(serialize(SubstanceUseHistory, substance_use_history)), 200
     
 @substance_use_history_bp.route('/get_substance_use_history', methods = ['GET'])
 @substance_use_history_bp.route('/get_substance_use_history/<id>', methods = ['GET'])
 @jwt_required()
+@conditional_response(SubstanceUseHistory)
+@cached_response(SubstanceUseHistory)
 def get_substance_use_history(id=None):
     """
     Gets a substance_use_history record for the user.
     
+    Query Parameters:
+        - fields (str) (optional): Comma separated column names, only these (and id) are loaded and returned.
+        - limit (int) (optional, list only): Page size. When limit or cursor is set, returns { data, next_cursor }.
+        - cursor (str) (optional, list only): The next_cursor from the previous page.
+        - view (str) (optional, list only): 'summary' returns only the id and timestamps of each record.
+    
     Returns:
         - If successful, returns a user's substance_use_history record.
         - If the substance_use_history does not exist in the database, returns a message with the error code 400.
@@ -206,61 +195,29 @@ def get_substance_use_history(id=None):
     user_id = get_jwt_identity()
     
     try:
-        user = db.session.query(User).filter_by(id=user_id).first()
+        fields = get_fields(SubstanceUseHistory)
 
-        if not user:
-            return jsonify("User not found."), 404
-        
         if id:
-            substance_use_history = db.session.query(SubstanceUseHistory).filter_by(user_id=user_id, id=id).first()
+            substance_use_history = db.session.query(SubstanceUseHistory).options(*load_fields(SubstanceUseHistory, fields)).filter_by(user_id=user_id, id=id).first()
             
             if(not substance_use_history):
                 return jsonify("Invalid substance_use_history id"), 400
 
-            return jsonify({
-                "id": substance_use_history.id,
-                "user_id": substance_use_history.user_id,
-                "alcohol": substance_use_history.alcohol,
-                "benzodiazepines": substance_use_history.benzodiazepines,
-                "cocaine": substance_use_history.cocaine,
-                "heroin": substance_use_history.heroin,
-                "kush": substance_use_history.kush,
-                "marijuana": substance_use_history.marijuana,
-                "methamphetamine": substance_use_history.methamphetamine,
-                "prescription_drugs": substance_use_history.prescription_drugs,
-                "tobacco": substance_use_history.tobacco,
-                "other_drugs": substance_use_history.other_drugs,
-                "notes": substance_use_history.notes,
-                "date_created": substance_use_history.date_created,
-                "date_last_modified": substance_use_history.date_last_modified
-            }), 200
+            return jsonify(serialize(SubstanceUseHistory, substance_use_history, fields)), 200
             
         else:
-            substance_use_history = db.session.query(SubstanceUseHistory).filter_by(user_id=user_id).all()
+            query = db.session.query(SubstanceUseHistory).filter_by(user_id=user_id)
 
-            if not substance_use_history:
-                return jsonify([]), 200
+            if is_summary_view():
+                return summary_response(query, SubstanceUseHistory), 200
 
-            substance_use_history_list = [{
-                "id": record.id,
-                "user_id": record.user_id,
-                "alcohol": record.alcohol,
-                "benzodiazepines": record.benzodiazepines,
-                "cocaine": record.cocaine,
-                "heroin": record.heroin,
-                "kush": record.kush,
-                "marijuana": record.marijuana,
-                "methamphetamine": record.methamphetamine,
-                "prescription_drugs": record.prescription_drugs,
-                "tobacco": record.tobacco,
-                "other_drugs": record.other_drugs,
-                "notes": record.notes,
-                "date_created": record.date_created,
-                "date_last_modified": record.date_last_modified
-            } for record in substance_use_history]
+            if fields:
+                return fields_response(query, SubstanceUseHistory, fields), 200
 
-            return jsonify(substance_use_history_list), 200
+            return json_list_response(query, SubstanceUseHistory), 200
         
+    except QueryParameterError as e:
+        return jsonify(f"{e}"), 400
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
     
@@ -281,13 +238,13 @@ def delete_substance_use_history(id):
     user_id = get_jwt_identity()
     
     try:
-        substance_use_history = db.session.query(SubstanceUseHistory).filter_by(user_id=user_id, id=id).first()
-        
+        substance_use_history = delete_record(SubstanceUseHistory, user_id, id)
+
         if not substance_use_history:
             return jsonify("substance_use_history record for this user does not exist."), 400
-        
-        db.session.delete(substance_use_history)
+
         db.session.commit()
+        invalidate(user_id, SubstanceUseHistory)
         
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
@@ -1,10 +1,27 @@
 from flask import Blueprint, jsonify, request
-from database import User, db, bcrypt, revoked_tokens
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
+from database import User, db
+from identity import invalidate_user
+import response_cache
+from passwords import HashingBusy, hash_password, check_password, needs_rehash
+from revocation import revoke_token, revoke_family, revoke_user
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity, get_jwt
 from datetime import datetime, timezone
+import uuid
 
 users_bp = Blueprint('users', __name__)
 
+def issue_tokens(user_id, family=None):
+    """
+    Creates an access token and a refresh token for the user. Both carry the id of their token family, which starts
+    at sign in and is passed on by every refresh, so a reused refresh token can revoke everything issued after it.
+    """
+    claims = { 'family': family or str(uuid.uuid4()) }
+
+    access_token = create_access_token(identity=user_id, additional_claims=claims)
+    refresh_token = create_refresh_token(identity=user_id, additional_claims=claims)
+
+    return access_token, refresh_token
+
 @users_bp.route('/signin', methods = ['POST'])
 def signin():
     data = request.get_json()
@@ -16,15 +33,26 @@ def signin():
     try:
         user = User.query.filter_by(email=email).first()
         
-        if(user is None or not bcrypt.check_password_hash(user.password, password)):
+        if(user is None or not check_password(user.password, password)):
             return jsonify({ 'error': 'Invalid credentials' }), 403
+
+        # Upgrade hashes made with an older, cheaper cost while the plain password is at hand. Best effort: the
+        # password was already checked, so a busy pool or a failed commit mustn't refuse the sign in
+        if needs_rehash(user.password):
+            try:
+                user.password = hash_password(password)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
         
-        access_token = create_access_token(identity=user.id)
+        access_token, refresh_token = issue_tokens(user.id)
         
+    except HashingBusy:
+        return jsonify("Too many sign in requests, try again shortly."), 503, { 'Retry-After': '1' }
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
 
-    return jsonify({ 'id': user.id, 'name': user.name, 'email': user.email, 'access_token': access_token}), 200
+    return jsonify({ 'id': user.id, 'name': user.name, 'email': user.email, 'access_token': access_token, 'refresh_token': refresh_token }), 200
    
 
 @users_bp.route('/signup', methods = ['POST'])
@@ -55,19 +83,21 @@ def signup():
         if existing_user:
             return jsonify("This user already exists."), 400
         
-        hashed_pwd = bcrypt.generate_password_hash(password).decode('utf-8')
+        hashed_pwd = hash_password(password)
         
         new_user = User(name=name, email=email, password=hashed_pwd, date_created=datetime.now(timezone.utc))
 
         db.session.add(new_user)
         db.session.commit()
         
-        access_token = create_access_token(identity=new_user.id)
+        access_token, refresh_token = issue_tokens(new_user.id)
 
+    except HashingBusy:
+        return jsonify("Too many sign up requests, try again shortly."), 503, { 'Retry-After': '1' }
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
     
-    return jsonify({ 'id': new_user.id, 'name': new_user.name, 'email': new_user.email, 'access_token': access_token}), 201
+    return jsonify({ 'id': new_user.id, 'name': new_user.name, 'email': new_user.email, 'access_token': access_token, 'refresh_token': refresh_token }), 201
 
 
 @users_bp.route('/signout', methods=['POST'])
@@ -75,13 +105,45 @@ def signup():
 def signout():    
     try:
 
-        jwt = get_jwt()['jti']
-        revoked_tokens.add(jwt)
+        revoke_token(get_jwt())
+        revoke_family(get_jwt())
     except Exception as error:
         return jsonify({ 'error': error }), 500
     
     return jsonify({ 'Success': 'User signed out successfully' })
    
+@users_bp.route('/refresh', methods = ['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    """
+    Exchanges a refresh token for a new access token and a new refresh token, without checking the password again.
+
+    Refresh tokens are single use: the one sent is revoked as part of the exchange. Sending a refresh token that was
+    already used revokes every token of its family and the user has to sign in again.
+
+    Request Headers:
+        - Authorization: Bearer <refresh_token>
+
+    Returns:
+        - If successful, returns the new access_token and refresh_token.
+        - If the refresh token was already used, returns error code 401.
+        - If there is an error processing the request, returns error code 500.
+    """
+    claims = get_jwt()
+
+    try:
+        # Revoking is atomic, so of two requests racing with the same token only one gets new tokens
+        if not revoke_token(claims):
+            revoke_family(claims)
+            return jsonify("Refresh token has already been used."), 401
+
+        access_token, refresh_token = issue_tokens(get_jwt_identity(), claims.get('family'))
+
+    except Exception as e:
+        return jsonify(f"Error processing request: {e}"), 500
+
+    return jsonify({ 'access_token': access_token, 'refresh_token': refresh_token }), 200
+
 @users_bp.route('/get_user', methods = ['POST'])
 @jwt_required()
 def get_user():
@@ -167,6 +229,9 @@ def delete_user():
         
         db.session.delete(user)
         db.session.commit()
+        invalidate_user(id)
+        revoke_user(id)
+        response_cache.invalidate_user(id)
     except Exception as e:
         return jsonify(f"Error processing request: {e}"), 500
     return jsonify("User deleted."), 200
\ No newline at end of file
@@ -0,0 +1,446 @@
+from flask import Response, g, jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import Date, DateTime, Text, and_, delete, func, insert, inspect, literal, or_, select, text, true, tuple_, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import load_only
+from database import db
+from serializers import serializer
+from datetime import datetime, timezone
+from functools import wraps
+import base64
+import hashlib
+import json
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+FOREIGN_KEY_VIOLATION = '23503'
+
+# to_char() pattern matching the RFC 822 dates jsonify writes for date and datetime values
+HTTP_DATE_FORMAT = 'Dy, DD Mon YYYY HH24:MI:SS "GMT"'
+
+class QueryParameterError(ValueError):
+    """
+    Raised when a list endpoint receives a malformed query parameter. Handlers map it to a 400 response.
+    """
+
+def insert_record(model, **values):
+    """
+    Inserts a form record with INSERT ... RETURNING and returns the stored row.
+
+    The response is built from the returned row, so values come back exactly as Postgres stored them (dates, JSONB)
+    without the ORM re-selecting the whole record after the commit expires it.
+    """
+    table = model.__table__
+
+    # Like the ORM, leave out None values for columns with a default so the default applies
+    values = { key: value for key, value in values.items() if value is not None or table.c[key].default is None }
+
+    return db.session.execute(insert(table).values(**values).returning(*table.columns)).one()
+
+def insert_records(model, rows):
+    """
+    Inserts several form records in one statement and returns the stored rows in the order of rows.
+
+    SQLAlchemy batches the parameter sets into multi-row INSERT ... VALUES ... RETURNING statements, so a batch costs
+    one round trip instead of one per record. Every row must have the same keys.
+    """
+    if not rows:
+        return []
+
+    table = model.__table__
+
+    return db.session.execute(insert(table).returning(*table.columns, sort_by_parameter_order=True), rows).all()
+
+def update_record(model, user_id, id, **values):
+    """
+    Updates a user's form record with UPDATE ... RETURNING.
+
+    Returns:
+        - The updated row.
+        - None if the user has no record with this id.
+    """
+    table = model.__table__
+    statement = update(table).where(table.c.id == id, table.c.user_id == user_id).values(**values)
+
+    return db.session.execute(statement.returning(*table.columns)).one_or_none()
+
+def array_update(model, user_id, id, array, target, value, *conditions):
+    """
+    Sets an ARRAY column of a user's record, or one of its items, to a SQL expression over the stored array and bumps
+    date_last_modified, in a single UPDATE ... RETURNING.
+
+    Returns:
+        - The array's new length and date_last_modified.
+        - None if the user has no record with this id or a condition doesn't hold.
+    """
+    table = model.__table__
+    statement = update(table).where(table.c.id == id, table.c.user_id == user_id, *conditions).values({
+        target: value,
+        table.c.date_last_modified: datetime.now(timezone.utc)
+    })
+    length = func.coalesce(func.cardinality(array), 0).label('length')
+
+    return db.session.execute(statement.returning(length, table.c.date_last_modified)).one_or_none()
+
+def append_item(model, user_id, id, name, item):
+    """
+    Appends an item to an ARRAY column of a user's record with array_append, without sending or re-reading the
+    array's other items.
+    """
+    array = model.__table__.c[name]
+    value = func.array_append(array, literal(item, array.type.item_type), type_=array.type)
+
+    return array_update(model, user_id, id, array, array, value)
+
+def replace_item(model, user_id, id, name, index, item):
+    """
+    Replaces the item at a 0-based index of an ARRAY column of a user's record. Returns None if there's no such item.
+    """
+    array = model.__table__.c[name]
+
+    return array_update(model, user_id, id, array, array[index + 1], literal(item, array.type.item_type), func.cardinality(array) > index)
+
+def remove_item(model, user_id, id, name, index):
+    """
+    Removes the item at a 0-based index of an ARRAY column of a user's record, joining the slices on either side of
+    it. Returns None if there's no such item.
+    """
+    array = model.__table__.c[name]
+    value = func.array_cat(array[1:index], array[index + 2:func.cardinality(array)], type_=array.type)
+
+    return array_update(model, user_id, id, array, array, value, func.cardinality(array) > index)
+
+def delete_record(model, user_id, id):
+    """
+    Deletes a user's form record with a single DELETE ... RETURNING id.
+
+    Returns:
+        - The deleted record's id.
+        - None if the user has no record with this id.
+    """
+    table = model.__table__
+    statement = delete(table).where(table.c.id == id, table.c.user_id == user_id).returning(table.c.id)
+
+    return db.session.execute(statement).scalar_one_or_none()
+
+def is_missing_user(error):
+    """
+    Whether an IntegrityError was raised by a form's user_id foreign key, meaning the token's user was deleted after
+    their identity was verified.
+    """
+    return getattr(error.orig, 'pgcode', None) == FOREIGN_KEY_VIOLATION
+
+def is_paginated():
+    """
+    Whether the client asked for a page of records with ?limit= or ?cursor=.
+    """
+    return 'limit' in request.args or 'cursor' in request.args
+
+def encode_cursor(record):
+    """
+    Builds an opaque cursor from the (date_last_modified, id) keyset of the last record on a page.
+    """
+    date_last_modified = record.date_last_modified.isoformat() if record.date_last_modified else None
+    payload = json.dumps([date_last_modified, record.id], separators=(',', ':'))
+
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Reverses encode_cursor, returning the (date_last_modified, id) keyset.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date_last_modified, id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+
+        if not isinstance(id, str):
+            raise ValueError
+
+        return (datetime.fromisoformat(date_last_modified) if date_last_modified else None), id
+    except (ValueError, TypeError):
+        raise QueryParameterError("Invalid cursor")
+
+def is_summary_view():
+    """
+    Whether the client asked for the lightweight listing of a form with ?view=summary.
+    """
+    view = request.args.get('view')
+
+    if view is None:
+        return False
+
+    if view != 'summary':
+        raise QueryParameterError("view must be 'summary'")
+
+    return True
+
+def get_page_size():
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE)
+
+    try:
+        limit = int(limit)
+    except (ValueError, TypeError):
+        raise QueryParameterError("limit must be an integer")
+
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise QueryParameterError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    return limit
+
+def keyset_query(query, model):
+    """
+    Orders a list query of one of the form models by its (date_last_modified DESC, id DESC) keyset and skips the
+    records up to and including ?cursor=.
+
+    Returns:
+        - The ordered query and the requested page size.
+    """
+    limit = get_page_size()
+    query = query.order_by(model.date_last_modified.desc(), model.id.desc())
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        date_last_modified, id = decode_cursor(cursor)
+
+        if date_last_modified is None:
+            query = query.filter(or_(
+                model.date_last_modified.isnot(None),
+                and_(model.date_last_modified.is_(None), model.id < id)
+            ))
+        else:
+            query = query.filter(tuple_(model.date_last_modified, model.id) < tuple_(date_last_modified, id))
+
+    return query, limit
+
+def paginate(query, model):
+    """
+    Applies keyset pagination to a list query of one of the form models.
+
+    Records are returned newest first, ordered by (date_last_modified DESC, id DESC) so the walk is served by the
+    (user_id, date_last_modified DESC) index. Postgres sorts NULL timestamps first in descending order, so rows that
+    predate date_last_modified are paged through before everything else.
+
+    Query Parameters:
+        - limit (int): Page size, between 1 and MAX_PAGE_SIZE. Defaults to DEFAULT_PAGE_SIZE.
+        - cursor (str): The next_cursor returned with the previous page.
+
+    Returns:
+        - Without ?limit= or ?cursor=, every record for the query and a next_cursor of None.
+        - Otherwise a page of records and the cursor of the following page, or None on the last page.
+    """
+    if not is_paginated():
+        return query.all(), None
+
+    query, limit = keyset_query(query, model)
+    records = query.limit(limit + 1).all()
+
+    if len(records) > limit:
+        records = records[:limit]
+        return records, encode_cursor(records[-1])
+
+    return records, None
+
+def list_response(records, next_cursor):
+    """
+    Serializes a list endpoint's records. Paginated requests get an envelope with the next_cursor, other requests
+    keep receiving a bare JSON array.
+    """
+    if is_paginated():
+        return jsonify({ 'data': records, 'next_cursor': next_cursor })
+
+    return jsonify(records)
+
+def get_fields(model):
+    """
+    Parses the ?fields= sparse fieldset for a form model.
+
+    Returns:
+        - None if the client didn't ask for specific fields.
+        - Otherwise the requested column names, always starting with id.
+        - Raises QueryParameterError for unknown columns or when combined with ?view=summary.
+    """
+    fields = request.args.get('fields')
+
+    if fields is None:
+        return None
+
+    if 'view' in request.args:
+        raise QueryParameterError("fields cannot be combined with view")
+
+    columns = inspect(model).column_attrs.keys()
+    names = ['id']
+
+    for name in fields.split(','):
+        name = name.strip()
+
+        if name not in columns:
+            raise QueryParameterError(f"Invalid field: {name}")
+
+        if name not in names:
+            names.append(name)
+
+    return names
+
+def load_fields(model, fields):
+    """
+    Query options that load only the requested fields (plus the pagination keyset) and defer every other column.
+    Returns no options when fields is None.
+    """
+    if not fields:
+        return []
+
+    keys = fields if 'date_last_modified' in fields else [*fields, 'date_last_modified']
+
+    return [load_only(*[getattr(model, key) for key in keys], raiseload=True)]
+
+def fields_response(query, model, fields):
+    """
+    Serves a list endpoint for a ?fields= request, loading and serializing only the requested columns.
+    """
+    records, next_cursor = paginate(query.options(*load_fields(model, fields)), model)
+
+    return list_response(serializer(model, fields).many(records), next_cursor)
+
+def summary_response(query, model, *columns):
+    """
+    Serves ?view=summary for a list endpoint. Only id, the given identifying columns and the timestamps are loaded,
+    every other column (including the JSONB payloads) stays deferred and is never fetched or decoded.
+
+    Parameters:
+        - query: The user's list query for the form.
+        - model: The form model being listed.
+        - columns: The identifying column(s) shown for each submission, may be empty. Only short, bounded columns such
+          as a name, status or date, never free-text notes.
+    """
+    return fields_response(query, model, ['id', *[column.key for column in columns], 'date_created', 'date_last_modified'])
+
+def json_value(column):
+    """
+    Formats a column in SQL the way jsonify formats its Python value, so JSON built by Postgres carries the same
+    values as JSON built from ORM objects.
+    """
+    if isinstance(column.type, DateTime):
+        return func.to_char(func.timezone('UTC', column), HTTP_DATE_FORMAT)
+
+    if isinstance(column.type, Date):
+        return func.to_char(column, HTTP_DATE_FORMAT)
+
+    return column
+
+def json_records(rows, table):
+    """
+    Formats each row of a subquery over a form table's columns with json_value().
+
+    Returns:
+        - The LATERAL select formatting one row, to join to rows ON true.
+        - row_to_json() of it, the record as jsonify would serialize it.
+    """
+    formatted = select(*[json_value(rows.c[column.name]).label(column.name) for column in table.columns])
+    formatted = formatted.correlate(rows).lateral()
+
+    return formatted, func.row_to_json(formatted.table_valued())
+
+def json_list_response(query, model):
+    """
+    Serves a list endpoint's full records with the JSON array built by Postgres, json_agg over row_to_json of each
+    record. Records never become ORM objects or Python dicts: the array comes back from Postgres as text and is
+    written to the response as is.
+
+    Pagination follows paginate(): without ?limit= or ?cursor= the bare array of every record, otherwise
+    { data, next_cursor }. The page position is numbered in SQL so the keyset of the page's last record comes back
+    with the array.
+    """
+    table = model.__table__
+    paginated = is_paginated()
+
+    if paginated:
+        query, limit = keyset_query(query, model)
+        position = func.row_number().over(order_by=(model.date_last_modified.desc(), model.id.desc()))
+        rows = query.with_entities(*table.columns, position.label('position')).limit(limit + 1).subquery()
+    else:
+        rows = query.with_entities(*table.columns).subquery()
+
+    formatted, record = json_records(rows, table)
+
+    if paginated:
+        records = func.json_agg(aggregate_order_by(record, rows.c.position)).filter(rows.c.position <= limit)
+        last = rows.c.position == limit
+        columns = [
+            func.count().label('count'),
+            func.max(rows.c.date_last_modified).filter(last).label('date_last_modified'),
+            func.max(rows.c.id).filter(last).label('id')
+        ]
+    else:
+        records = func.json_agg(record)
+        columns = []
+
+    data = func.coalesce(records, text("'[]'::json")).cast(Text).label('data')
+    result = db.session.execute(select(data, *columns).select_from(rows).join(formatted, true())).one()
+
+    if not paginated:
+        return Response(result.data, mimetype='application/json')
+
+    next_cursor = encode_cursor(result) if result.count > limit else None
+
+    return Response(f'{{"data":{result.data},"next_cursor":{json.dumps(next_cursor)}}}', mimetype='application/json')
+
+def conditional_response(model):
+    """
+    Adds ETag and Last-Modified to a get_<form> route and answers matching If-None-Match / If-Modified-Since requests
+    with 304 Not Modified. Goes below @jwt_required() and above @cached_response(), which caches bodies per ETag.
+
+    The validators are read without touching the record payloads: a single record's date_last_modified, or the
+    count and max(date_last_modified) of the user's records, an index-only scan of the (user_id, date_last_modified)
+    index. The ETag also covers the query string, since ?fields=, ?view= and pagination change the body.
+
+    If-Modified-Since is only honored for single records, a deleted record doesn't move a list's Last-Modified.
+    """
+    form = model.__table__.name
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            id = kwargs.get('id')
+            user_id = get_jwt_identity()
+
+            if id:
+                statement = select(model.date_last_modified).where(model.user_id == user_id, model.id == id)
+                record = db.session.execute(statement).first()
+
+                # The handler answers for records that don't exist
+                if record is None:
+                    return view(*args, **kwargs)
+
+                last_modified = state = record.date_last_modified
+            else:
+                statement = select(func.count(), func.max(model.date_last_modified)).where(model.user_id == user_id)
+                count, last_modified = db.session.execute(statement).one()
+                state = count
+
+            validator = f'{form}:{id}:{state}:{last_modified}:{request.query_string.decode()}'
+            etag = hashlib.sha1(validator.encode()).hexdigest()
+
+            # @cached_response keys its entries on the ETag, so a body cached before a write is never served with a
+            # validator read after it
+            g.etag = etag
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                not_modified = bool(id and last_modified and request.if_modified_since
+                                    and last_modified.replace(microsecond=0) <= request.if_modified_since)
+
+            response = Response(status=304) if not_modified else make_response(view(*args, **kwargs))
+
+            if response.status_code in (200, 304):
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'private, no-cache'
+                if last_modified:
+                    response.last_modified = last_modified
+
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,88 @@
+"""
+Compares Flask's default JSON provider with the orjson-backed provider on
+realistic form payloads: lists of ReferralsAndServices and InfantInformation
+records as the get_<form> handlers return them, with nested JSONB, dates and
+timestamps. Encoding is timed through provider.response(), the jsonify path.
+
+Checks that both providers produce the same bytes before timing them. Needs no
+database.
+
+Usage (from the backend directory):
+    python benchmarks/json_provider.py --records 50 --iterations 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import ARRAY, DATE, TIMESTAMP
+from sqlalchemy.dialects.postgresql import JSONB
+import database
+import json_provider
+
+SERVICE = {
+    'status': 'Referred',
+    'organization': 'Brazos Valley Community Action Programs',
+    'organization_contact_information': '979-846-1100, 3991 E 29th St, Bryan TX'
+}
+
+def sample_value(column, index):
+    """
+    A value shaped like what the form stores in a column.
+    """
+    if isinstance(column.type, ARRAY):
+        return [{ 'name': f'Item {i}', 'notes': 'Takes twice daily with food', 'date': '2024-03-01' } for i in range(3)]
+    if isinstance(column.type, JSONB):
+        return dict(SERVICE)
+    if isinstance(column.type, DATE):
+        return date(2024, 1 + index % 12, 1 + index % 28)
+    if isinstance(column.type, TIMESTAMP):
+        return datetime(2024, 5, 13, 14, 49, index % 60, 25496, tzinfo=timezone.utc)
+    return f'{column.name} value {index}'
+
+def sample_records(model, count):
+    return [{ column.name: sample_value(column, i) for column in model.__table__.columns } for i in range(count)]
+
+def throughput(function, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    return 1 / statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=50, help='Records per payload')
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    if json_provider.orjson is None:
+        parser.error('orjson is not installed')
+
+    app = Flask(__name__)
+    default = DefaultJSONProvider(app)
+    fast = json_provider.OrjsonProvider(app)
+
+    for model in (database.ReferralsAndServices, database.InfantInformation):
+        records = sample_records(model, args.records)
+        encoded = default.response(records).get_data()
+
+        if fast.response(records).get_data() != encoded:
+            sys.exit(f'{model.__table__.name}: the providers produced different output')
+
+        print(f'{model.__table__.name}: {args.records} records, {len(encoded) / 1024:.1f} KiB')
+        for label, provider in (('default', default), ('orjson', fast)):
+            encode = throughput(lambda: provider.response(records).get_data(), args.iterations)
+            decode = throughput(lambda: provider.loads(encoded), args.iterations)
+            print(f'  [{label:>7}] encode {encode:9.1f}/s   decode {decode:9.1f}/s')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Measures list serialization throughput, in records per second, of the
+compiled per-model serializers against the hand-written response dicts they
+replaced, for every form model.
+
+"Hand-written" is the dict literal the routes used to spell out, one
+record.<column> lookup per key, generated here from the model's columns.
+Records are ORM instances, so the hand-written dicts pay for SQLAlchemy's
+instrumented descriptors on every attribute read, as they did in the routes.
+Needs no database.
+
+Usage (from the backend directory):
+    python benchmarks/serializers.py --records 1000 --iterations 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from serializers import serializer
+
+def hand_written(model):
+    """
+    Compiles the dict literal a route would spell out by hand for the model.
+    """
+    names = [column.name for column in model.__table__.columns]
+    source = 'def serialize(record):\n    return {' + ', '.join(f'{name!r}: record.{name}' for name in names) + '}'
+
+    namespace = {}
+    exec(source, namespace)
+
+    return namespace['serialize']
+
+def sample_records(model, count):
+    now = datetime.now(timezone.utc)
+    records = []
+
+    for i in range(count):
+        values = { column.name: f'{column.name} {i}' for column in model.__table__.columns }
+        values.update(date_created=now, date_last_modified=now)
+        records.append(model(**values))
+
+    return records
+
+def throughput(function, records, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function(records)
+        timings.append(time.perf_counter() - start)
+
+    return len(records) / statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=1000, help='Records per list')
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f'{"form":<36} {"columns":>7} {"hand-written":>14} {"compiled":>14} {"speedup":>8}')
+
+    for model in database.FORM_MODELS:
+        records = sample_records(model, args.records)
+        before = hand_written(model)
+        after = serializer(model)
+
+        if [before(record) for record in records] != after.many(records):
+            sys.exit(f'{model.__table__.name}: the serializers produced different output')
+
+        old = throughput(lambda records: [before(record) for record in records], records, args.iterations)
+        new = throughput(after.many, records, args.iterations)
+
+        print(f'{model.__table__.name:<36} {len(after.names):>7} {old:>12.0f}/s {new:>12.0f}/s {new / old:>7.2f}x')
+
+if __name__ == '__main__':
+    main()
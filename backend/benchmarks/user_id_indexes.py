@@ -0,0 +1,121 @@
+"""
+Compares query plans and latencies of the per-user form queries with and
+without the (user_id, date_last_modified DESC) indexes.
+
+Everything runs inside a single transaction that is rolled back at the end, so
+the seeded rows and the dropped/recreated index never become visible to other
+connections. Point it at a scratch database all the same.
+
+Usage (from the backend directory):
+    python benchmarks/user_id_indexes.py --database-uri postgresql+psycopg2://... \
+        --table drug_screening_results --users 2000 --rows-per-user 100
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import ARRAY, DATE, create_engine, text
+from sqlalchemy.dialects.postgresql import JSONB
+import database
+
+FORM_MODELS = { model.__table__.name: model for model in database.FORM_MODELS }
+
+def placeholder_value(column):
+    """
+    SQL literal used to fill a NOT NULL form column while seeding.
+    """
+    if isinstance(column.type, ARRAY):
+        return "ARRAY['{}'::jsonb]"
+    if isinstance(column.type, JSONB):
+        return "'{}'::jsonb"
+    if isinstance(column.type, DATE):
+        return 'current_date'
+    return "'seed'"
+
+def seed(connection, table, users, rows_per_user):
+    connection.execute(text("""
+        INSERT INTO "user" (id, name, email, password)
+        SELECT 'bench-' || u, 'bench', 'bench-' || u || '@example.com', 'x'
+        FROM generate_series(1, :users) AS u
+    """), { 'users': users })
+
+    columns = ['id', 'user_id', 'date_created', 'date_last_modified']
+    values = [
+        "md5(u || '-' || r)",
+        "'bench-' || u",
+        "now() - (r || ' minutes')::interval",
+        "now() - (r || ' minutes')::interval"
+    ]
+    for column in table.columns:
+        if column.name not in columns and not column.nullable:
+            columns.append(f'"{column.name}"')
+            values.append(placeholder_value(column))
+
+    connection.execute(text(f"""
+        INSERT INTO {table.name} ({', '.join(columns)})
+        SELECT {', '.join(values)}
+        FROM generate_series(1, :users) AS u, generate_series(1, :rows_per_user) AS r
+    """), { 'users': users, 'rows_per_user': rows_per_user })
+
+    connection.execute(text(f'ANALYZE {table.name}'))
+
+def measure(connection, table, user_id, iterations):
+    queries = {
+        'list': f"SELECT * FROM {table.name} WHERE user_id = :user_id ORDER BY date_last_modified DESC",
+        'latest': f"SELECT * FROM {table.name} WHERE user_id = :user_id ORDER BY date_last_modified DESC LIMIT 1"
+    }
+
+    for label, query in queries.items():
+        plan = connection.execute(text(f'EXPLAIN (ANALYZE, BUFFERS) {query}'), { 'user_id': user_id }).scalars().all()
+
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            connection.execute(text(query), { 'user_id': user_id }).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        print(f'  [{label}] median {statistics.median(timings):.3f} ms, p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:.3f} ms')
+        for line in plan:
+            print(f'      {line}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-uri', default=os.getenv('SQLALCHEMY_DATABASE_URI'))
+    parser.add_argument('--table', default='drug_screening_results', choices=sorted(FORM_MODELS))
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--rows-per-user', type=int, default=100)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    if not args.database_uri:
+        parser.error('--database-uri or SQLALCHEMY_DATABASE_URI is required')
+
+    table = FORM_MODELS[args.table].__table__
+    index_name = f'ix_{table.name}_user_id_last_modified'
+    engine = create_engine(args.database_uri)
+
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            print(f'Seeding {args.users * args.rows_per_user} rows into {table.name}...')
+            seed(connection, table, args.users, args.rows_per_user)
+            user_id = f'bench-{args.users // 2}'
+
+            connection.execute(text(f'DROP INDEX IF EXISTS {index_name}'))
+            connection.execute(text(f'ANALYZE {table.name}'))
+            print('\nWithout index:')
+            measure(connection, table, user_id, args.iterations)
+
+            connection.execute(text(f'CREATE INDEX {index_name} ON {table.name} (user_id, date_last_modified DESC)'))
+            connection.execute(text(f'ANALYZE {table.name}'))
+            print('\nWith index:')
+            measure(connection, table, user_id, args.iterations)
+        finally:
+            transaction.rollback()
+
+if __name__ == '__main__':
+    main()
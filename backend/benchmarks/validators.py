@@ -0,0 +1,84 @@
+"""
+Measures the cost of validating a submitted record, in microseconds, for
+every form: a valid record, which is checked in full, and an invalid one with
+a wrongly typed value and, where the form has one, a missing required field.
+
+Records are built from the model's columns with values shaped like the ones
+the frontend sends. Needs no database.
+
+Usage (from the backend directory):
+    python benchmarks/validators.py --iterations 20000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import ARRAY, DATE
+from sqlalchemy.dialects.postgresql import JSONB
+import database
+from validators import SERVER_COLUMNS, validate
+
+def sample_value(column):
+    if isinstance(column.type, ARRAY):
+        return [{ 'name': f'Item {i}', 'notes': 'Takes twice daily with food', 'date': '2024-03-01' } for i in range(3)]
+    if isinstance(column.type, JSONB):
+        return { 'status': 'Referred', 'organization': 'Brazos Valley Community Action Programs' }
+    if isinstance(column.type, DATE):
+        return '2024-03-01'
+    return f'{column.name} value'
+
+def sample_record(model):
+    return { column.name: sample_value(column) for column in model.__table__.columns if column.name not in SERVER_COLUMNS }
+
+def invalid_record(model, record):
+    """
+    The record with a number in its first column, which no column type accepts, and its next required column left out.
+    """
+    record = dict(record)
+    names = list(record)
+
+    record[names[0]] = 5
+    required = [column.name for column in model.__table__.columns if column.name in names[1:] and not column.nullable]
+    if required:
+        del record[required[0]]
+
+    return record
+
+def cost(model, record, iterations):
+    """
+    Median microseconds per validation over batches of 100 records.
+    """
+    timings = []
+    for _ in range(max(iterations // 100, 1)):
+        start = time.perf_counter()
+        for _ in range(100):
+            validate(model, record)
+        timings.append((time.perf_counter() - start) / 100)
+
+    return statistics.median(timings) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f'{"form":<36} {"columns":>7} {"valid":>10} {"invalid":>10}')
+
+    for model in database.FORM_MODELS:
+        record = sample_record(model)
+        invalid = invalid_record(model, record)
+
+        if validate(model, record) or not validate(model, invalid):
+            sys.exit(f'{model.__table__.name}: unexpected validation result')
+
+        valid_cost = cost(model, record, args.iterations)
+        invalid_cost = cost(model, invalid, args.iterations)
+
+        print(f'{model.__table__.name:<36} {len(record):>7} {valid_cost:>8.2f}us {invalid_cost:>8.2f}us')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+from database import db, CHANGES_CHANNEL
+from threading import Lock, Thread
+import json
+import os
+import select
+import time
+
+import response_cache
+
+# How long the listener waits on the socket before a SELECT 1 checks the connection is still alive
+POLL_SECONDS = 5
+RECONNECT_SECONDS = 1
+
+listener_pid = None
+listener_lock = Lock()
+stats = { 'notifications': 0, 'reconnects': 0 }
+
+def init_app(app):
+    """
+    Starts the worker's change listener before its first request. Starting it lazily, and again if the process id
+    changed, means each gunicorn worker runs its own thread even when the app was loaded before forking.
+    """
+    if not app.config.get('CHANGES_LISTENER', True):
+        return
+
+    @app.before_request
+    def ensure_listener():
+        if listener_pid != os.getpid():
+            start_listener(db.engine)
+
+def start_listener(engine):
+    global listener_pid
+
+    with listener_lock:
+        if listener_pid == os.getpid():
+            return
+
+        listener_pid = os.getpid()
+        Thread(target=listen, args=(engine,), name='careplan-changes', daemon=True).start()
+
+def handle(payload):
+    """
+    Evicts the cached responses a careplan_changes notification makes stale.
+    """
+    change = json.loads(payload)
+    response_cache.cache.invalidate(change['user_id'], change['table'], change.get('id'))
+    stats['notifications'] += 1
+
+def listen(engine):
+    """
+    Runs LISTEN careplan_changes on a dedicated connection for the life of the worker.
+
+    Notifications sent while the connection was down are lost, so after reconnecting the whole response cache is
+    cleared rather than trusted.
+    """
+    connected_before = False
+
+    while True:
+        connection = None
+
+        try:
+            # Taken out of the pool for good, the pool never hands it to a request
+            pooled = engine.raw_connection()
+            connection = pooled.driver_connection
+            pooled.detach()
+
+            connection.autocommit = True
+            connection.cursor().execute(f'LISTEN {CHANGES_CHANNEL}')
+
+            if connected_before:
+                response_cache.cache.clear()
+                stats['reconnects'] += 1
+            connected_before = True
+
+            while True:
+                if select.select([connection], [], [], POLL_SECONDS) == ([], [], []):
+                    # A quiet socket can also be a dead one, a round trip raises if the connection was lost so the
+                    # except below reconnects and clears the cache
+                    connection.cursor().execute('SELECT 1')
+                else:
+                    connection.poll()
+
+                while connection.notifies:
+                    handle(connection.notifies.pop(0).payload)
+
+        except Exception:
+            if connection is not None:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+
+            time.sleep(RECONNECT_SECONDS)
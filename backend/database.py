@@ -1,5 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import Column, String, ARRAY, DATE, Integer, TIMESTAMP
+from sqlalchemy import Column, String, ARRAY, DATE, DDL, Integer, TIMESTAMP, event, func
 from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
 import uuid
@@ -7,7 +7,6 @@ from flask_bcrypt import Bcrypt
 
 db = SQLAlchemy()
 bcrypt = Bcrypt()
-revoked_tokens = set()
 
 class User(db.Model):
     __tablename__ = 'user'
@@ -58,6 +57,9 @@ class MaternalDemographics(db.Model):
     date_created = Column(TIMESTAMP(timezone=True))
     date_last_modified = Column(TIMESTAMP(timezone=True))
 
+    __table_args__ = (
+        db.Index('ix_maternal_demographics_user_id_last_modified', user_id, date_last_modified.desc()),
+    )
 
 class MaternalMedicalHistory(db.Model):
     __tablename__ = 'maternal_medical_history'
@@ -86,6 +88,10 @@ class MaternalMedicalHistory(db.Model):
     user_id = Column(String, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     date_created = Column(TIMESTAMP(timezone=True))
     date_last_modified = Column(TIMESTAMP(timezone=True))
+
+    __table_args__ = (
+        db.Index('ix_maternal_medical_history_user_id_last_modified', user_id, date_last_modified.desc()),
+    )
     
 class PsychiatricHistory(db.Model):
     __tablename__ = 'psychiatric_history'
@@ -97,6 +103,10 @@ class PsychiatricHistory(db.Model):
     user_id = Column(String, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     date_created = Column(TIMESTAMP(timezone=True))
     date_last_modified = Column(TIMESTAMP(timezone=True))
+
+    __table_args__ = (
+        db.Index('ix_psychiatric_history_user_id_last_modified', user_id, date_last_modified.desc()),
+    )
     
 class SubstanceUseHistory(db.Model):
     __tablename___ = 'substance_use_history'
@@ -118,6 +128,10 @@ class SubstanceUseHistory(db.Model):
     date_created = Column(TIMESTAMP(timezone=True))
     date_last_modified = Column(TIMESTAMP(timezone=True), default=datetime)
 
+    __table_args__ = (
+        db.Index('ix_substance_use_history_user_id_last_modified', user_id, date_last_modified.desc()),
+    )
+
 class MedicalServicesForSubstanceUse(db.Model):    
     __tablename__ = 'medical_services_for_substance_use'
     
@@ -136,6 +150,10 @@ class MedicalServicesForSubstanceUse(db.Model):
     date_created = Column(TIMESTAMP(timezone=True))
     date_last_modified = Column(TIMESTAMP(timezone=True))
 
+    __table_args__ = (
+        db.Index('ix_medical_services_for_substance_use_user_id_last_modified', user_id, date_last_modified.desc()),
+    )
+
 class DrugScreeningResults(db.Model):
     __tablename__ = 'drug_screening_results'
     
@@ -145,6 +163,10 @@ class DrugScreeningResults(db.Model):
     user_id = Column(String, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     date_created = Column(TIMESTAMP(timezone=True))
     date_last_modified = Column(TIMESTAMP(timezone=True))
+
+    __table_args__ = (
+        db.Index('ix_drug_screening_results_user_id_last_modified', user_id, date_last_modified.desc()),
+    )
     
 class FamilyAndSupports(db.Model):
     __tablename__ = 'family_and_supports'
@@ -160,6 +182,10 @@ class FamilyAndSupports(db.Model):
     user_id = Column(String, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     date_created = Column(TIMESTAMP(timezone=True))
     date_last_modified = Column(TIMESTAMP(timezone=True))
+
+    __table_args__ = (
+        db.Index('ix_family_and_supports_user_id_last_modified', user_id, date_last_modified.desc()),
+    )
     
 class InfantInformation(db.Model):
     __tablename__ = 'infant_information'
@@ -203,6 +229,10 @@ class InfantInformation(db.Model):
     user_id = Column(String, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     date_created = Column(TIMESTAMP(timezone=True))
     date_last_modified = Column(TIMESTAMP(timezone=True))
+
+    __table_args__ = (
+        db.Index('ix_infant_information_user_id_last_modified', user_id, date_last_modified.desc()),
+    )
     
 class ReferralsAndServices(db.Model):
     __tablename__ = 'referrals_and_services'
@@ -251,6 +281,10 @@ class ReferralsAndServices(db.Model):
     user_id = Column(String, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     date_created = Column(TIMESTAMP(timezone=True))
     date_last_modified = Column(TIMESTAMP(timezone=True))
+
+    __table_args__ = (
+        db.Index('ix_referrals_and_services_user_id_last_modified', user_id, date_last_modified.desc()),
+    )
         
 class RelapsePreventionPlan(db.Model):
     __tablename__ = 'relapse_prevention_plan'
@@ -265,4 +299,78 @@ class RelapsePreventionPlan(db.Model):
     
     user_id = Column(String, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     date_created = Column(TIMESTAMP(timezone=True))
-    date_last_modified = Column(TIMESTAMP(timezone=True))
\ No newline at end of file
+    date_last_modified = Column(TIMESTAMP(timezone=True))
+
+    __table_args__ = (
+        db.Index('ix_relapse_prevention_plan_user_id_last_modified', user_id, date_last_modified.desc()),
+    )
+
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_token'
+
+    jti = Column(String, primary_key=True)
+    # The token's exp claim, after which the row is no longer needed
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False, index=True)
+    # Lets each worker's Bloom filter fetch only the tokens revoked since its last refresh
+    revoked_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now(), index=True)
+
+class ImportCheckpoint(db.Model):
+    __tablename__ = 'import_checkpoint'
+
+    # Resolved path of the file being imported by `flask careplan import`
+    source = Column(String, primary_key=True)
+    # Number of input records already merged into the form tables
+    line = Column(Integer, nullable=False)
+    date_last_modified = Column(TIMESTAMP(timezone=True))
+
+# Every form of the Plan of Safe Care, in the order they appear in the care plan
+FORM_MODELS = [
+    MaternalDemographics,
+    MaternalMedicalHistory,
+    PsychiatricHistory,
+    SubstanceUseHistory,
+    MedicalServicesForSubstanceUse,
+    DrugScreeningResults,
+    FamilyAndSupports,
+    InfantInformation,
+    ReferralsAndServices,
+    RelapsePreventionPlan
+]
+
+# Statement-level triggers on the form tables send one NOTIFY careplan_changes per user touched by a write, with the
+# table, the user_id and the id of the record when a single one changed. Every worker listens (see changes.py) and
+# evicts its cached responses, whichever process made the write.
+CHANGES_CHANNEL = 'careplan_changes'
+
+NOTIFY_CHANGES_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION notify_careplan_changes() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('{CHANGES_CHANNEL}', json_build_object(
+            'table', TG_TABLE_NAME, 'user_id', user_id, 'id', CASE WHEN count(*) = 1 THEN min(id) END
+        )::text) FROM old_rows GROUP BY user_id;
+    ELSE
+        PERFORM pg_notify('{CHANGES_CHANNEL}', json_build_object(
+            'table', TG_TABLE_NAME, 'user_id', user_id, 'id', CASE WHEN count(*) = 1 THEN min(id) END
+        )::text) FROM new_rows GROUP BY user_id;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+def notify_changes_triggers(table):
+    transition_tables = { 'INSERT': 'NEW TABLE AS new_rows', 'UPDATE': 'NEW TABLE AS new_rows', 'DELETE': 'OLD TABLE AS old_rows' }
+
+    return [
+        f"CREATE OR REPLACE TRIGGER {table}_notify_{operation.lower()} AFTER {operation} ON {table} "
+        f"REFERENCING {transition} FOR EACH STATEMENT EXECUTE FUNCTION notify_careplan_changes()"
+        for operation, transition in transition_tables.items()
+    ]
+
+event.listen(db.metadata, 'before_create', DDL(NOTIFY_CHANGES_FUNCTION))
+
+for model in FORM_MODELS:
+    for trigger in notify_changes_triggers(model.__table__.name):
+        event.listen(model.__table__, 'after_create', DDL(trigger))
@@ -0,0 +1,63 @@
+from database import User, db
+from threading import Lock
+import time
+
+# jti -> (user_id, exp) for access tokens whose user has already been confirmed to exist
+verified_tokens = {}
+verified_tokens_lock = Lock()
+
+PRUNE_INTERVAL_SECONDS = 60
+next_prune = 0
+
+def prune_verified_tokens(now):
+    """
+    Drops entries whose token has expired. Runs at most once every PRUNE_INTERVAL_SECONDS.
+    """
+    global next_prune
+
+    if now < next_prune:
+        return
+
+    next_prune = now + PRUNE_INTERVAL_SECONDS
+
+    for jti, (_, exp) in list(verified_tokens.items()):
+        if exp <= now:
+            del verified_tokens[jti]
+
+def verify_identity(jwt_payload):
+    """
+    Confirms that the user a token was issued to still exists, querying the User table at most once per token.
+
+    Registered as the JWT user_lookup_loader, so it runs for every @jwt_required() route before the handler does.
+
+    Returns:
+        - The user's id if the user exists.
+        - None if the user was deleted, which flask_jwt_extended turns into the user_lookup_error_loader response.
+    """
+    jti = jwt_payload['jti']
+    user_id = jwt_payload['sub']
+
+    with verified_tokens_lock:
+        if jti in verified_tokens:
+            return verified_tokens[jti][0]
+
+    if not db.session.query(User.id).filter_by(id=user_id).first():
+        return None
+
+    now = time.time()
+    exp = jwt_payload.get('exp', now + 3600)
+
+    with verified_tokens_lock:
+        prune_verified_tokens(now)
+        verified_tokens[jti] = (user_id, exp)
+
+    return user_id
+
+def invalidate_user(user_id):
+    """
+    Forgets every verified token of a deleted user so their next request re-checks the User table.
+    """
+    with verified_tokens_lock:
+        for jti, (verified_user_id, _) in list(verified_tokens.items()):
+            if verified_user_id == user_id:
+                del verified_tokens[jti]
@@ -0,0 +1,192 @@
+from flask.cli import AppGroup
+from database import db, FORM_MODELS, ImportCheckpoint
+from sqlalchemy import ARRAY, String, func, text
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from itertools import islice
+import click
+import csv
+import io
+import json
+import os
+
+careplan_cli = AppGroup('careplan', help='Care plan data management commands.')
+
+FORMS = { model.__table__.name: model for model in FORM_MODELS }
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Holds one batch at a time, its rows disappear when the batch's transaction commits
+CREATE_STAGING_TABLE = """
+    CREATE TEMP TABLE IF NOT EXISTS careplan_import_staging (
+        form text NOT NULL,
+        record jsonb NOT NULL
+    ) ON COMMIT DELETE ROWS
+"""
+
+def read_ndjson(file):
+    """
+    Yields (form, record) pairs from NDJSON lines shaped like the /export_careplan output: { form, record }.
+    """
+    for number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+
+        try:
+            entry = json.loads(line)
+            yield entry['form'], entry['record']
+        except (ValueError, KeyError, TypeError):
+            raise click.ClickException(f"Line {number} is not a {{ form, record }} JSON object")
+
+def read_csv(file, form):
+    """
+    Yields (form, record) pairs from a CSV file of one form whose header row names the form's columns.
+
+    Cells of JSONB columns hold JSON text. Empty cells of non-text columns are read as NULL.
+    """
+    table = FORMS[form].__table__
+
+    for row in csv.DictReader(file):
+        record = {}
+
+        for name, value in row.items():
+            if name not in table.c:
+                raise click.ClickException(f"Unknown column for {form}: {name}")
+
+            column_type = table.c[name].type
+
+            if value == '' and not isinstance(column_type, String):
+                value = None
+            elif isinstance(column_type, (JSONB, ARRAY)):
+                value = json.loads(value)
+
+            record[name] = value
+
+        yield form, record
+
+def merge_statement(table):
+    """
+    Set-based INSERT ... SELECT moving one form's staged records into its table.
+
+    Records are typed with jsonb_populate_record against the form table's own row type. Missing ids and timestamps
+    are filled in, records of users that don't exist are skipped, and records whose id is already stored are left
+    untouched so a batch can be replayed safely.
+    """
+    defaults = {
+        'id': 'coalesce(record.id, gen_random_uuid()::text)',
+        'date_created': 'coalesce(record.date_created, now())',
+        'date_last_modified': 'coalesce(record.date_last_modified, now())'
+    }
+    columns = [f'"{column.name}"' for column in table.columns]
+    values = [defaults.get(column.name, f'record."{column.name}"') for column in table.columns]
+
+    return text(f"""
+        INSERT INTO {table.name} ({', '.join(columns)})
+        SELECT {', '.join(values)}
+        FROM careplan_import_staging AS staging
+        CROSS JOIN LATERAL jsonb_populate_record(NULL::{table.name}, staging.record) AS record
+        WHERE staging.form = :form AND EXISTS (SELECT 1 FROM "user" WHERE "user".id = record.user_id)
+        ON CONFLICT (id) DO NOTHING
+    """)
+
+def copy_batch(connection, batch):
+    """
+    Loads a batch of (form, record) pairs into the staging table with COPY.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    for form, record in batch:
+        writer.writerow([form, json.dumps(record)])
+
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    cursor.copy_expert('COPY careplan_import_staging (form, record) FROM STDIN WITH (FORMAT csv)', buffer)
+
+def import_batch(connection, source, line, batch):
+    """
+    Stages and merges one batch and moves the checkpoint past it, all in the caller's transaction, so a batch is
+    either fully imported and checkpointed or not at all.
+
+    Returns:
+        - The number of records inserted and the number skipped.
+    """
+    copy_batch(connection, batch)
+
+    staged = {}
+    for form, _ in batch:
+        staged[form] = staged.get(form, 0) + 1
+
+    inserted = 0
+    for form in staged:
+        inserted += connection.execute(merge_statement(FORMS[form].__table__), { 'form': form }).rowcount
+
+    checkpoint = insert(ImportCheckpoint).values(source=source, line=line, date_last_modified=func.now())
+    connection.execute(checkpoint.on_conflict_do_update(
+        index_elements=[ImportCheckpoint.source],
+        set_={ 'line': checkpoint.excluded.line, 'date_last_modified': checkpoint.excluded.date_last_modified }
+    ))
+
+    return inserted, len(batch) - inserted
+
+@careplan_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--form', type=click.Choice(sorted(FORMS)), help='Form of every record. Required for CSV files.')
+@click.option('--user-id', help='Assign every record to this user instead of the user_id in the file.')
+@click.option('--batch-size', type=click.IntRange(min=1), default=DEFAULT_BATCH_SIZE, show_default=True)
+@click.option('--restart', is_flag=True, help='Ignore the checkpoint of a previous run and start from the top.')
+def import_records(path, form, user_id, batch_size, restart):
+    """
+    Bulk imports form records from a CSV or NDJSON file.
+
+    NDJSON files hold one { form, record } object per line, like /export_careplan. CSV files hold the records of
+    a single --form with a header row of column names.
+
+    Each batch is copied into a staging table with COPY and merged into the form tables with one INSERT ... SELECT
+    per form. The number of records imported is checkpointed with every batch, so an interrupted import resumes
+    after the last committed batch when the command is run again.
+    """
+    source = os.path.realpath(path)
+    is_csv = path.lower().endswith('.csv')
+
+    if is_csv and not form:
+        raise click.UsageError('--form is required for CSV files')
+
+    with db.engine.connect() as connection:
+        with connection.begin():
+            connection.execute(text(CREATE_STAGING_TABLE))
+
+            if restart:
+                connection.execute(ImportCheckpoint.__table__.delete().where(ImportCheckpoint.source == source))
+
+            checkpoint = connection.execute(
+                ImportCheckpoint.__table__.select().where(ImportCheckpoint.source == source)
+            ).one_or_none()
+
+        line = checkpoint.line if checkpoint else 0
+        if line:
+            click.echo(f'Resuming {path} after record {line}')
+
+        with open(path, newline='', encoding='utf-8') as file:
+            records = read_csv(file, form) if is_csv else read_ndjson(file)
+            records = islice(records, line, None)
+            total_inserted = total_skipped = 0
+
+            while batch := list(islice(records, batch_size)):
+                for entry_form, record in batch:
+                    if entry_form not in FORMS:
+                        raise click.ClickException(f'Unknown form: {entry_form}')
+                    if user_id:
+                        record['user_id'] = user_id
+
+                try:
+                    with connection.begin():
+                        inserted, skipped = import_batch(connection, source, line + len(batch), batch)
+                except Exception as e:
+                    raise click.ClickException(f'Records {line + 1}-{line + len(batch)} failed, nothing after record {line} was imported: {e}')
+
+                line += len(batch)
+                total_inserted += inserted
+                total_skipped += skipped
+                click.echo(f'{line} records processed: {total_inserted} inserted, {total_skipped} skipped')
+
+    click.echo(f'Imported {path}: {total_inserted} records inserted, {total_skipped} skipped')
@@ -0,0 +1,78 @@
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+from datetime import date
+import dataclasses
+import decimal
+import uuid
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def default(o):
+    """
+    Converts the values orjson is told to pass through exactly like DefaultJSONProvider does: dates and datetimes to
+    RFC 822 strings, decimals and UUIDs to strings.
+    """
+    if isinstance(o, date):
+        return http_date(o)
+
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+
+    if dataclasses.is_dataclass(o):
+        return dataclasses.asdict(o)
+
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider backed by orjson, installed by init_app when orjson is available.
+
+    Responses (jsonify) match DefaultJSONProvider: sorted keys, compact separators (indented when debugging), dates
+    and datetimes as RFC 822 strings. The one difference is that non-ASCII characters are written as UTF-8 instead of
+    \\u escapes. Anything orjson rejects, such as integers wider than 64 bits, or NaN when parsing, falls back to the
+    default provider. dumps() is left to the default provider, its spaced separators can't be produced by orjson.
+
+    Request bodies are parsed with orjson too, since request.get_json() goes through the app's provider.
+    """
+    def options(self):
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+
+        if self.compact is False or (self.compact is None and self._app.debug):
+            options |= orjson.OPT_INDENT_2
+
+        return options
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            return super().loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+
+        try:
+            body = orjson.dumps(obj, default=default, option=self.options())
+        except orjson.JSONEncodeError:
+            return super().response(obj)
+
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+def init_app(app):
+    """
+    Replaces the app's JSON provider with OrjsonProvider when orjson is installed.
+    """
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
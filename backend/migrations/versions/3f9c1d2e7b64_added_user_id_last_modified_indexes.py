@@ -0,0 +1,55 @@
+"""added (user_id, date_last_modified) indexes to form tables
+
+Revision ID: 3f9c1d2e7b64
+Revises: ac8aeb34396b
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c1d2e7b64'
+down_revision = 'ac8aeb34396b'
+branch_labels = None
+depends_on = None
+
+FORM_TABLES = [
+    'drug_screening_results',
+    'family_and_supports',
+    'infant_information',
+    'maternal_demographics',
+    'maternal_medical_history',
+    'medical_services_for_substance_use',
+    'psychiatric_history',
+    'referrals_and_services',
+    'relapse_prevention_plan',
+    'substance_use_history',
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so each
+    # index is built in autocommit mode without locking the table for writes
+    with op.get_context().autocommit_block():
+        for table in FORM_TABLES:
+            op.create_index(
+                f'ix_{table}_user_id_last_modified',
+                table,
+                ['user_id', sa.text('date_last_modified DESC')],
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in FORM_TABLES:
+            op.drop_index(
+                f'ix_{table}_user_id_last_modified',
+                table_name=table,
+                if_exists=True,
+                postgresql_concurrently=True
+            )
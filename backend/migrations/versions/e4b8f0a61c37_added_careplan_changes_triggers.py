@@ -0,0 +1,70 @@
+"""added careplan_changes NOTIFY triggers to form tables
+
+Revision ID: e4b8f0a61c37
+Revises: c71e3b9a5d28
+Create Date: 2026-10-18 21:15:44.862019
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b8f0a61c37'
+down_revision = 'c71e3b9a5d28'
+branch_labels = None
+depends_on = None
+
+FORM_TABLES = [
+    'drug_screening_results',
+    'family_and_supports',
+    'infant_information',
+    'maternal_demographics',
+    'maternal_medical_history',
+    'medical_services_for_substance_use',
+    'psychiatric_history',
+    'referrals_and_services',
+    'relapse_prevention_plan',
+    'substance_use_history',
+]
+
+TRANSITION_TABLES = {
+    'INSERT': 'NEW TABLE AS new_rows',
+    'UPDATE': 'NEW TABLE AS new_rows',
+    'DELETE': 'OLD TABLE AS old_rows',
+}
+
+
+def upgrade():
+    op.execute("""
+    CREATE OR REPLACE FUNCTION notify_careplan_changes() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            PERFORM pg_notify('careplan_changes', json_build_object(
+                'table', TG_TABLE_NAME, 'user_id', user_id, 'id', CASE WHEN count(*) = 1 THEN min(id) END
+            )::text) FROM old_rows GROUP BY user_id;
+        ELSE
+            PERFORM pg_notify('careplan_changes', json_build_object(
+                'table', TG_TABLE_NAME, 'user_id', user_id, 'id', CASE WHEN count(*) = 1 THEN min(id) END
+            )::text) FROM new_rows GROUP BY user_id;
+        END IF;
+
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """)
+
+    for table in FORM_TABLES:
+        for operation, transition in TRANSITION_TABLES.items():
+            op.execute(
+                f"CREATE OR REPLACE TRIGGER {table}_notify_{operation.lower()} AFTER {operation} ON {table} "
+                f"REFERENCING {transition} FOR EACH STATEMENT EXECUTE FUNCTION notify_careplan_changes()"
+            )
+
+
+def downgrade():
+    for table in FORM_TABLES:
+        for operation in TRANSITION_TABLES:
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_notify_{operation.lower()} ON {table}")
+
+    op.execute("DROP FUNCTION IF EXISTS notify_careplan_changes()")
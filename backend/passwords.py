@@ -0,0 +1,111 @@
+from database import bcrypt
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import BoundedSemaphore, Lock
+import math
+import multiprocessing
+import time
+
+# bcrypt cost used to time this machine, cheap enough to run at startup
+CALIBRATION_LOG_ROUNDS = 8
+# Never below flask_bcrypt's default cost, which hashed every password before calibration existed
+MIN_LOG_ROUNDS = 12
+MAX_LOG_ROUNDS = 16
+
+class HashingBusy(Exception):
+    """
+    Raised when the worker already has BCRYPT_MAX_PENDING hashes queued. Handlers map it to a 503 response.
+    """
+
+pool = None
+pool_lock = Lock()
+pool_size = 2
+pending = BoundedSemaphore(8)
+log_rounds = 12
+
+def init_app(app):
+    """
+    Sizes the hashing pool and sets BCRYPT_LOG_ROUNDS, calibrating it when it isn't configured. Must run before
+    bcrypt.init_app(app) so flask_bcrypt picks up the calibrated cost.
+    """
+    global pool_size, pending, log_rounds
+
+    pool_size = app.config.get('BCRYPT_POOL_SIZE', 2)
+    pending = BoundedSemaphore(app.config.get('BCRYPT_MAX_PENDING', 4 * pool_size))
+
+    if not app.config.get('BCRYPT_LOG_ROUNDS'):
+        app.config['BCRYPT_LOG_ROUNDS'] = calibrate_log_rounds(app.config.get('BCRYPT_TARGET_MS', 250))
+
+    log_rounds = app.config['BCRYPT_LOG_ROUNDS']
+
+def calibrate_log_rounds(target_ms):
+    """
+    Picks the highest bcrypt cost whose hash takes at most target_ms on this machine, between MIN_LOG_ROUNDS and
+    MAX_LOG_ROUNDS.
+
+    Each extra round doubles the work, so hashing once at CALIBRATION_LOG_ROUNDS is enough to extrapolate.
+    """
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        bcrypt.generate_password_hash('calibration', CALIBRATION_LOG_ROUNDS)
+        timings.append(time.perf_counter() - start)
+
+    rounds = CALIBRATION_LOG_ROUNDS + math.floor(math.log2(target_ms / 1000 / min(timings)))
+
+    return max(MIN_LOG_ROUNDS, min(MAX_LOG_ROUNDS, rounds))
+
+def get_pool():
+    """
+    The worker's hashing processes, started on first use so each gunicorn worker has its own after it has booted.
+
+    By then the worker is running request threads and the changes listener, and forking a process with running
+    threads can leave the child blocked on a lock another thread held at the fork. The processes are started by a
+    forkserver instead, a clean single-threaded process that imports this module afresh.
+    """
+    global pool
+
+    with pool_lock:
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=pool_size, mp_context=multiprocessing.get_context('forkserver'))
+
+        return pool
+
+def run(function, *args):
+    """
+    Runs a hashing function in the pool and waits for its result.
+
+    At most BCRYPT_MAX_PENDING hashes are queued or running per worker. Past that HashingBusy is raised right away,
+    so a burst of logins is turned away quickly instead of piling up behind the CPU-bound hashes.
+    """
+    global pool
+
+    if not pending.acquire(blocking=False):
+        raise HashingBusy()
+
+    try:
+        return get_pool().submit(function, *args).result()
+    except BrokenProcessPool:
+        with pool_lock:
+            pool = None
+        raise
+    finally:
+        pending.release()
+
+def generate_hash(password, rounds):
+    return bcrypt.generate_password_hash(password, rounds).decode('utf-8')
+
+def check_hash(hashed, password):
+    return bcrypt.check_password_hash(hashed, password)
+
+def hash_password(password):
+    return run(generate_hash, password, log_rounds)
+
+def check_password(hashed, password):
+    return run(check_hash, hashed, password)
+
+def needs_rehash(hashed):
+    """
+    Whether a stored hash ($2b$<cost>$...) was made with a lower cost than BCRYPT_LOG_ROUNDS.
+    """
+    return int(hashed.split('$')[2]) < log_rounds
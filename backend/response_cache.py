@@ -0,0 +1,152 @@
+from flask import Response, g, make_response, request
+from flask_jwt_extended import get_jwt_identity
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+import time
+
+class ResponseCache:
+    """
+    Per-worker LRU cache of encoded JSON responses with a time to live and a cap on the bytes it holds.
+
+    Entries are grouped by (user_id, form) so a write to a form drops every cached response of that form for the user,
+    the list as well as single records and every combination of query parameters.
+    """
+    def __init__(self, max_bytes, ttl_seconds):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.groups = {}
+        self.size = 0
+        self.lock = Lock()
+        self.stats = { 'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0 }
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is None or entry[1] <= time.time():
+                if entry is not None:
+                    self.discard(key)
+                self.stats['misses'] += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+
+            return entry[0]
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+
+        with self.lock:
+            self.discard(key)
+
+            self.entries[key] = (body, time.time() + self.ttl_seconds)
+            self.groups.setdefault(key[:2], set()).add(key)
+            self.size += len(body)
+
+            # Least recently used entries go first once the byte cap is exceeded
+            while self.size > self.max_bytes:
+                self.discard(next(iter(self.entries)))
+                self.stats['evictions'] += 1
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+
+        if entry is None:
+            return
+
+        self.size -= len(entry[0])
+
+        group = self.groups.get(key[:2])
+        group.discard(key)
+        if not group:
+            del self.groups[key[:2]]
+
+    def invalidate(self, user_id, form, id=None):
+        """
+        Drops a user's cached responses of a form. With an id, single record responses of other records are kept.
+        """
+        with self.lock:
+            for key in list(self.groups.get((user_id, form), ())):
+                if id is None or key[2] is None or key[2] == id:
+                    self.discard(key)
+
+            self.stats['invalidations'] += 1
+
+    def invalidate_user(self, user_id):
+        with self.lock:
+            for group in [group for group in self.groups if group[0] == user_id]:
+                for key in list(self.groups.get(group, ())):
+                    self.discard(key)
+
+            self.stats['invalidations'] += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.groups.clear()
+            self.size = 0
+
+            self.stats['invalidations'] += 1
+
+    def metrics(self):
+        with self.lock:
+            return { **self.stats, 'entries': len(self.entries), 'bytes': self.size, 'max_bytes': self.max_bytes }
+
+cache = ResponseCache(32 * 1024 * 1024, 30)
+
+def init_app(app):
+    global cache
+
+    max_bytes = app.config.get('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024)
+    cache = ResponseCache(max_bytes, app.config.get('RESPONSE_CACHE_SECONDS', 30))
+
+def cached_response(model):
+    """
+    Caches a get_<form> route's successful responses per user, record id and query string. Goes below
+    @jwt_required() so the token is checked before the cache is read.
+
+    The cached entries of the form are dropped by invalidate(), which the form's add_, update_ and delete_ handlers
+    call after committing, and by the careplan_changes listener (see changes.py) for writes made by other workers
+    and processes. RESPONSE_CACHE_SECONDS bounds staleness if a notification is missed.
+
+    Below @conditional_response(), entries are also keyed on the ETag it computed from the database. After a write
+    the ETag changes, so a body cached before the write is never served again, even if its invalidation hasn't
+    reached this worker. At worst that body is kept until it expires or is evicted.
+    """
+    form = model.__table__.name
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = (get_jwt_identity(), form, kwargs.get('id'), request.query_string, g.get('etag'))
+            body = cache.get(key)
+
+            if body is not None:
+                return Response(body, status=200, mimetype='application/json')
+
+            response = make_response(view(*args, **kwargs))
+
+            if response.status_code == 200 and not response.is_streamed:
+                cache.put(key, response.get_data())
+
+            return response
+
+        return wrapper
+
+    return decorator
+
+def invalidate(user_id, model):
+    """
+    Drops the cached responses of a user's form after it was written to.
+    """
+    cache.invalidate(user_id, model.__table__.name)
+
+def invalidate_user(user_id):
+    """
+    Drops every cached response of a deleted user.
+    """
+    cache.invalidate_user(user_id)
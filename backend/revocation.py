@@ -0,0 +1,424 @@
+from database import RevokedToken, db
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from datetime import datetime, timezone
+from threading import Lock
+import hashlib
+import math
+import time
+
+class PostgresRevocationStore:
+    """
+    Keeps revoked token ids in the revoked_token table, shared by every worker. Expired rows are deleted whenever a
+    token is revoked, using the index on expires_at.
+    """
+    def revoke(self, jti, exp):
+        """
+        Returns whether the token was newly revoked, False if it already was.
+        """
+        expires_at = datetime.fromtimestamp(exp, timezone.utc)
+
+        db.session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= func.now()))
+        statement = insert(RevokedToken).values(jti=jti, expires_at=expires_at).on_conflict_do_nothing()
+        revoked = db.session.execute(statement).rowcount == 1
+        db.session.commit()
+
+        return revoked
+
+    def is_revoked(self, jti):
+        statement = select(RevokedToken.jti).where(RevokedToken.jti == jti, RevokedToken.expires_at > func.now())
+
+        return db.session.execute(statement).first() is not None
+
+    def revoked_since(self, since):
+        """
+        Returns the ids of unexpired tokens revoked at or after since (epoch seconds, None for all of them) and the
+        database's clock, to be passed as since on the next call.
+        """
+        statement = select(func.extract('epoch', func.now()), func.array_agg(RevokedToken.jti))
+        statement = statement.where(RevokedToken.expires_at > func.now())
+
+        if since is not None:
+            statement = statement.where(RevokedToken.revoked_at >= func.to_timestamp(since))
+
+        now, jtis = db.session.execute(statement).one()
+
+        return jtis or [], float(now)
+
+class RedisRevocationStore:
+    """
+    Keeps revoked token ids as Redis keys that expire with the token, plus a sorted set of recent revocations scored
+    by revocation time that the Bloom filters are refreshed from.
+
+    Parameters:
+        - client: Anything speaking the redis-py set/exists/zadd/zrangebyscore/zremrangebyscore interface, a
+          redis.Redis or a LocalRedis.
+        - retention_seconds: How long revocations stay in the sorted set. Must be at least the refresh token lifetime.
+    """
+    KEY_PREFIX = 'careplan:revoked:'
+    RECENT_KEY = 'careplan:revocations'
+
+    def __init__(self, client, retention_seconds=30 * 86400):
+        self.client = client
+        self.retention_seconds = retention_seconds
+
+    def revoke(self, jti, exp):
+        """
+        Returns whether the token was newly revoked, False if it already was.
+        """
+        now = time.time()
+        ttl = max(1, int(exp - now))
+
+        if not self.client.set(self.KEY_PREFIX + jti, 1, ex=ttl, nx=True):
+            return False
+
+        self.client.zadd(self.RECENT_KEY, { jti: now })
+        self.client.zremrangebyscore(self.RECENT_KEY, '-inf', now - self.retention_seconds)
+
+        return True
+
+    def is_revoked(self, jti):
+        return bool(self.client.exists(self.KEY_PREFIX + jti))
+
+    def revoked_since(self, since):
+        now = time.time()
+        jtis = self.client.zrangebyscore(self.RECENT_KEY, '-inf' if since is None else since, '+inf')
+
+        return [jti.decode() if isinstance(jti, bytes) else jti for jti in jtis], now
+
+class LocalRedis:
+    """
+    In-process stand-in for a Redis server implementing the commands RedisRevocationStore uses. It is not shared
+    between workers, so only use it for tests and single-process development.
+    """
+    def __init__(self):
+        self.values = {}
+        self.sorted_sets = {}
+        self.lock = Lock()
+
+    def set(self, name, value, ex=None, nx=False):
+        # The existence check and the write happen under one lock, as SET NX is atomic in Redis
+        with self.lock:
+            if nx and self.live(name):
+                return None
+
+            self.values[name] = (value, time.time() + ex if ex else None)
+
+        return True
+
+    def exists(self, name):
+        with self.lock:
+            return 1 if self.live(name) else 0
+
+    def live(self, name):
+        """
+        Whether name holds an unexpired value, dropping it if it expired. The caller holds the lock.
+        """
+        if name not in self.values:
+            return False
+
+        _, expires = self.values[name]
+        if expires is not None and expires <= time.time():
+            del self.values[name]
+            return False
+
+        return True
+
+    def zadd(self, name, mapping):
+        with self.lock:
+            self.sorted_sets.setdefault(name, {}).update(mapping)
+
+        return len(mapping)
+
+    def zrangebyscore(self, name, min, max):
+        min, max = float(min), float(max)
+
+        with self.lock:
+            members = self.sorted_sets.get(name, {})
+            return [member for member, score in sorted(members.items(), key=lambda item: item[1]) if min <= score <= max]
+
+    def zremrangebyscore(self, name, min, max):
+        min, max = float(min), float(max)
+
+        with self.lock:
+            members = self.sorted_sets.get(name, {})
+            removed = [member for member, score in members.items() if min <= score <= max]
+            for member in removed:
+                del members[member]
+
+            return len(removed)
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter of strings. Membership tests can return false positives at about false_positive_rate
+    while holding up to capacity items, but never false negatives.
+    """
+    def __init__(self, capacity, false_positive_rate):
+        self.capacity = capacity
+        self.false_positive_rate = false_positive_rate
+        self.size = max(8, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, item):
+        # Double hashing: the k positions are derived from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self.positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(item))
+
+    def estimated_false_positive_rate(self):
+        """
+        The false positive rate expected for the number of items added so far.
+        """
+        return (1 - math.exp(-self.hash_count * self.count / self.size)) ** self.hash_count
+
+store = None
+
+# jti -> (revoked, cached_until), the per-worker read-through cache in front of the store
+cache = {}
+cache_lock = Lock()
+cache_seconds = 5
+
+PRUNE_INTERVAL_SECONDS = 60
+next_prune = 0
+
+# Per-worker Bloom filter of revoked jtis. A token not in the filter is not revoked and needs no store lookup.
+bloom = None
+bloom_lock = Lock()
+bloom_capacity = 10000
+bloom_false_positive_rate = 0.001
+refresh_seconds = 1
+rebuild_seconds = 600
+next_refresh = 0
+next_rebuild = 0
+refreshed_until = None
+
+# Store keys of revoked token families and deleted users, kept alongside the revoked jtis
+FAMILY_PREFIX = 'family:'
+USER_PREFIX = 'user:'
+
+# Refreshes re-read revocations this far back, covering clock skew and transactions that committed late
+REFRESH_OVERLAP_SECONDS = 5
+
+stats = { 'lookups': 0, 'filter_negatives': 0, 'filter_false_positives': 0, 'store_lookups': 0, 'refreshes': 0, 'rebuilds': 0 }
+
+# Refresh tokens are rotated on every use, so a token family can live this long past its last refresh
+family_seconds = 30 * 86400
+
+def init_app(app):
+    global store, cache_seconds, bloom_capacity, bloom_false_positive_rate, refresh_seconds, rebuild_seconds
+    global family_seconds
+
+    url = app.config.get('REVOCATION_STORE_URL', 'postgresql')
+    refresh_expires = app.config.get('JWT_REFRESH_TOKEN_EXPIRES')
+
+    if refresh_expires:
+        family_seconds = refresh_expires.total_seconds()
+
+    store = create_store(url, family_seconds)
+    cache_seconds = app.config.get('REVOCATION_CACHE_SECONDS', 5)
+    bloom_capacity = app.config.get('REVOCATION_BLOOM_CAPACITY', 10000)
+    bloom_false_positive_rate = app.config.get('REVOCATION_BLOOM_FALSE_POSITIVE_RATE', 0.001)
+    refresh_seconds = app.config.get('REVOCATION_REFRESH_SECONDS', 1)
+    rebuild_seconds = app.config.get('REVOCATION_REBUILD_SECONDS', 600)
+
+def create_store(url, retention_seconds=30 * 86400):
+    """
+    Builds the revocation store named by REVOCATION_STORE_URL:
+        - 'postgresql': the revoked_token table (default).
+        - 'redis://...' or 'rediss://...': a Redis server, requires the redis package.
+        - 'local': a LocalRedis that lives in this process.
+    """
+    if url == 'postgresql':
+        return PostgresRevocationStore()
+
+    if url == 'local':
+        return RedisRevocationStore(LocalRedis(), retention_seconds)
+
+    if url.startswith(('redis://', 'rediss://')):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("REVOCATION_STORE_URL points at Redis but the redis package is not installed")
+
+        return RedisRevocationStore(redis.Redis.from_url(url), retention_seconds)
+
+    raise ValueError(f"Unsupported REVOCATION_STORE_URL: {url}")
+
+def prune_cache(now):
+    """
+    Drops cache entries that are no longer valid. Runs at most once every PRUNE_INTERVAL_SECONDS.
+    """
+    global next_prune
+
+    if now < next_prune:
+        return
+
+    next_prune = now + PRUNE_INTERVAL_SECONDS
+
+    for jti, (_, cached_until) in list(cache.items()):
+        if cached_until <= now:
+            del cache[jti]
+
+def remember(jti, revoked, cached_until):
+    now = time.time()
+
+    with cache_lock:
+        prune_cache(now)
+        cache[jti] = (revoked, cached_until)
+
+def refresh_bloom(now):
+    """
+    Brings the worker's Bloom filter up to date with the store.
+
+    Every refresh_seconds only the revocations since the previous refresh are fetched and added. Every
+    rebuild_seconds, or once the filter holds more than its capacity, it is rebuilt from the unexpired revocations so
+    expired tokens stop taking up room and the false positive rate stays near its target.
+    """
+    global bloom, next_refresh, next_rebuild, refreshed_until
+
+    if now < next_refresh:
+        return
+
+    with bloom_lock:
+        if now < next_refresh:
+            return
+
+        rebuild = bloom is None or now >= next_rebuild or bloom.count > bloom.capacity
+        since = None if rebuild else refreshed_until - REFRESH_OVERLAP_SECONDS
+        jtis, refreshed_until = store.revoked_since(since)
+
+        if rebuild:
+            fresh = BloomFilter(max(bloom_capacity, 2 * len(jtis)), bloom_false_positive_rate)
+            for jti in jtis:
+                fresh.add(jti)
+
+            bloom = fresh
+            next_rebuild = now + rebuild_seconds
+            stats['rebuilds'] += 1
+        else:
+            for jti in jtis:
+                if jti not in bloom:
+                    bloom.add(jti)
+
+        next_refresh = now + refresh_seconds
+        stats['refreshes'] += 1
+
+def revoke(key, exp):
+    """
+    Revokes a token id or family key until exp, returning whether it was newly revoked.
+    """
+    revoked = store.revoke(key, exp)
+    remember(key, True, exp)
+
+    with bloom_lock:
+        if bloom is not None:
+            bloom.add(key)
+
+    return revoked
+
+def revoke_token(jwt_payload):
+    """
+    Revokes a token until its exp claim passes.
+
+    Returns:
+        - True if the token was newly revoked, False if it had already been revoked. Rotating a refresh token relies
+          on this to notice two requests racing with the same token.
+    """
+    return revoke(jwt_payload['jti'], jwt_payload.get('exp', time.time() + 3600))
+
+def revoke_family(jwt_payload):
+    """
+    Revokes every access and refresh token descended from the same sign in as this token. Later refreshes keep
+    issuing tokens of the family for up to family_seconds, so the family stays revoked that long.
+    """
+    family = jwt_payload.get('family')
+
+    if family:
+        revoke(FAMILY_PREFIX + family, time.time() + family_seconds)
+
+def revoke_user(user_id):
+    """
+    Revokes every token issued to a deleted user, in every worker. None can be issued later, but the newest refresh
+    token may still be valid for family_seconds, so the user stays revoked that long.
+    """
+    revoke(USER_PREFIX + user_id, time.time() + family_seconds)
+
+def is_revoked(key, exp, now):
+    """
+    Looks a token id or family key up: the worker's Bloom filter, then the per-worker cache, then the store.
+    """
+    stats['lookups'] += 1
+
+    if key not in bloom:
+        stats['filter_negatives'] += 1
+        return False
+
+    with cache_lock:
+        entry = cache.get(key)
+
+    if entry and entry[1] > now:
+        return entry[0]
+
+    revoked = store.is_revoked(key)
+    stats['store_lookups'] += 1
+    if not revoked:
+        stats['filter_false_positives'] += 1
+
+    remember(key, revoked, exp if revoked else min(exp, now + cache_seconds))
+
+    return revoked
+
+def is_token_revoked(jwt_payload):
+    """
+    Whether a token, or the family it belongs to, has been revoked. Registered as the JWT token_in_blocklist_loader.
+
+    The worker's Bloom filter answers first: a token it doesn't contain was not revoked as of the last refresh, which
+    covers nearly every request without touching the store. Tokens in the filter are checked against the per-worker
+    cache and then the store. A revoked token stays cached until it expires. A filter false positive is cached for
+    REVOCATION_CACHE_SECONDS.
+
+    A refresh token is revoked once it has been rotated, so seeing one again means it was copied. Its whole family is
+    revoked then, logging out whoever holds the newer tokens. Tokens of a deleted user are revoked as well.
+    """
+    now = time.time()
+    exp = jwt_payload.get('exp', now + 3600)
+
+    refresh_bloom(now)
+
+    if is_revoked(jwt_payload['jti'], exp, now):
+        if jwt_payload.get('type') == 'refresh':
+            revoke_family(jwt_payload)
+        return True
+
+    family = jwt_payload.get('family')
+
+    if family and is_revoked(FAMILY_PREFIX + family, exp, now):
+        return True
+
+    return is_revoked(USER_PREFIX + jwt_payload['sub'], exp, now)
+
+def metrics():
+    """
+    The worker's revocation counters and Bloom filter state.
+    """
+    return {
+        **stats,
+        'bloom_items': bloom.count if bloom else 0,
+        'bloom_bits': bloom.size if bloom else 0,
+        'bloom_hash_count': bloom.hash_count if bloom else 0,
+        'bloom_false_positive_rate': bloom_false_positive_rate,
+        'bloom_estimated_false_positive_rate': bloom.estimated_false_positive_rate() if bloom else 0.0
+    }
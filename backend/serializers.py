@@ -0,0 +1,57 @@
+from database import FORM_MODELS
+from sqlalchemy import inspect
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+
+class Serializer:
+    """
+    Turns records of one form model into the dicts the routes return, one key per column.
+
+    The column names are read once and compiled into an itemgetter and an attrgetter. A loaded ORM object keeps its
+    column values in its instance __dict__, so the itemgetter fetches them all in one C-level call without going
+    through SQLAlchemy's attribute descriptors. Records that aren't ORM objects (the Rows returned by INSERT/UPDATE ...
+    RETURNING) or that have expired or unloaded columns fall back to the attrgetter, which reads them the normal way.
+    """
+    __slots__ = ('names', 'items', 'attributes')
+
+    def __init__(self, names):
+        self.names = tuple(names)
+
+        # Both getters return a bare value rather than a tuple when given a single name
+        if len(self.names) == 1:
+            name = self.names[0]
+            self.items = lambda state: (state[name],)
+            self.attributes = lambda record: (getattr(record, name),)
+        else:
+            self.items = itemgetter(*self.names)
+            self.attributes = attrgetter(*self.names)
+
+    def __call__(self, record):
+        try:
+            values = self.items(record.__dict__)
+        except (AttributeError, KeyError):
+            values = self.attributes(record)
+
+        return dict(zip(self.names, values))
+
+    def many(self, records):
+        return [self(record) for record in records]
+
+# Built at import, so every form's serializer is compiled once at startup
+serializers = { model: Serializer(column.key for column in inspect(model).column_attrs) for model in FORM_MODELS }
+
+@lru_cache(maxsize=256)
+def fields_serializer(model, fields):
+    return Serializer(fields)
+
+def serializer(model, fields=None):
+    """
+    The serializer for a form model, for every column or, given a ?fields= list, only those columns.
+    """
+    if fields:
+        return fields_serializer(model, tuple(fields))
+
+    return serializers[model]
+
+def serialize(model, record, fields=None):
+    return serializer(model, fields)(record)
@@ -0,0 +1,58 @@
+"""
+The tests run against a real Postgres database and are skipped when SQLALCHEMY_DATABASE_URI isn't set. Point it at a
+scratch database: the app creates its tables there and the tests add and delete their own users.
+
+Usage (from the backend directory):
+    SQLALCHEMY_DATABASE_URI=postgresql+psycopg2://... python -m pytest -q
+"""
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('SECRET_KEY', 'careplan-test-secret-key-at-least-32-bytes')
+os.environ.setdefault('BCRYPT_LOG_ROUNDS', '4')
+# Each test client is a single worker, writes made behind its back must not be picked up by a listener
+os.environ.setdefault('CHANGES_LISTENER', 'false')
+
+PAYLOADS = {
+    'psychiatric_history': { 'diagnosis': [{ 'diagnosis': 'Anxiety', 'provider': 'Dr. Smith' }], 'notes': 'Initial notes' },
+    'drug_screening_results': { 'tests': [{ 'drug_name': 'Opioids', 'results': 'Negative' }] },
+    'relapse_prevention_plan': {
+        'three_things_that_trigger_desire_to_use': 'Stress',
+        'three_skills_you_enjoy': 'Painting',
+        'three_people_to_talk_to': 'Sister',
+        'safe_caregivers': [{ 'name': 'Ann', 'contact_number': '555-0100', 'relationship': 'Sister' }],
+        'have_naloxone': 'Yes',
+        'comments': 'None'
+    }
+}
+
+@pytest.fixture(scope='session')
+def app():
+    if not os.getenv('SQLALCHEMY_DATABASE_URI'):
+        pytest.skip('SQLALCHEMY_DATABASE_URI is not set')
+
+    import wsgi
+
+    return wsgi.app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def headers(client):
+    """
+    Authorization headers of a new user, deleted with their records after the test.
+    """
+    response = client.post('/signup', json={ 'name': 'Test', 'email': f'{uuid.uuid4()}@example.com', 'password': 'password' })
+    assert response.status_code == 201, response.data
+
+    headers = { 'Authorization': f"Bearer {response.json['access_token']}" }
+    yield headers
+
+    client.delete('/delete_user', json={ 'id': response.json['id'] })
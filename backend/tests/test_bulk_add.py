@@ -0,0 +1,14 @@
+from conftest import PAYLOADS
+
+def test_bulk_add_applies_defaults_like_add(client, headers):
+    records = [{ 'notes': 'No diagnosis yet' }, { **PAYLOADS['psychiatric_history'], 'diagnosis': None }]
+
+    single = client.post('/add_psychiatric_history', json=records[0], headers=headers)
+    assert single.status_code == 201, single.data
+
+    response = client.post('/bulk_add_psychiatric_history', json=records, headers=headers)
+
+    assert response.status_code == 201, response.data
+    assert response.json['errors'] == []
+    assert single.json['diagnosis'] == []
+    assert [record['diagnosis'] for record in response.json['records']] == [[], []]
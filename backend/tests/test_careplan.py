@@ -0,0 +1,18 @@
+from conftest import PAYLOADS
+
+def test_careplan_matches_get_form(client, headers):
+    for form, payload in PAYLOADS.items():
+        assert client.post(f'/add_{form}', json=payload, headers=headers).status_code == 201
+        assert client.post(f'/add_{form}', json=payload, headers=headers).status_code == 201
+
+    careplan = client.get('/get_careplan', headers=headers)
+    assert careplan.status_code == 200
+
+    for form in PAYLOADS:
+        records = client.get(f'/get_{form}', headers=headers).json
+        key = lambda record: record['id']
+
+        assert sorted(careplan.json[form], key=key) == sorted(records, key=key)
+        assert careplan.json[form][0]['date_created'].endswith(' GMT')
+
+    assert careplan.json['maternal_demographics'] == []
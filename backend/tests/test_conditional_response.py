@@ -0,0 +1,50 @@
+import os
+
+from sqlalchemy import create_engine, text
+
+from conftest import PAYLOADS
+
+def write_from_another_worker(id, notes):
+    """
+    Updates a record over a separate connection, like a write handled by another gunicorn worker whose invalidation
+    never reaches this one.
+    """
+    engine = create_engine(os.environ['SQLALCHEMY_DATABASE_URI'])
+
+    with engine.begin() as connection:
+        connection.execute(
+            text("UPDATE psychiatric_history SET notes = :notes, date_last_modified = now() WHERE id = :id"),
+            { 'notes': notes, 'id': id }
+        )
+
+    engine.dispose()
+
+def test_write_by_another_worker_changes_etag_and_body(client, headers):
+    record = client.post('/add_psychiatric_history', json=PAYLOADS['psychiatric_history'], headers=headers).json
+    url = f"/get_psychiatric_history/{record['id']}"
+
+    first = client.get(url, headers=headers)
+    assert first.status_code == 200
+    assert client.get(url, headers={ **headers, 'If-None-Match': first.headers['ETag'] }).status_code == 304
+
+    write_from_another_worker(record['id'], 'Changed by another worker')
+
+    second = client.get(url, headers={ **headers, 'If-None-Match': first.headers['ETag'] })
+    assert second.status_code == 200
+    assert second.json['notes'] == 'Changed by another worker'
+    assert second.headers['ETag'] != first.headers['ETag']
+
+    third = client.get(url, headers={ **headers, 'If-None-Match': second.headers['ETag'] })
+    assert third.status_code == 304
+
+def test_list_is_not_served_from_cache_after_write_by_another_worker(client, headers):
+    record = client.post('/add_psychiatric_history', json=PAYLOADS['psychiatric_history'], headers=headers).json
+
+    first = client.get('/get_psychiatric_history', headers=headers)
+    assert first.status_code == 200
+
+    write_from_another_worker(record['id'], 'Changed by another worker')
+
+    second = client.get('/get_psychiatric_history', headers={ **headers, 'If-None-Match': first.headers['ETag'] })
+    assert second.status_code == 200
+    assert second.json[0]['notes'] == 'Changed by another worker'
@@ -0,0 +1,21 @@
+import uuid
+
+import identity
+import revocation
+
+def test_deleted_users_tokens_are_rejected_by_every_worker(client):
+    user = client.post('/signup', json={ 'name': 'Test', 'email': f'{uuid.uuid4()}@example.com', 'password': 'password' }).json
+    headers = { 'Authorization': f"Bearer {user['access_token']}" }
+
+    assert client.get('/get_psychiatric_history', headers=headers).status_code == 200
+    verified = dict(identity.verified_tokens)
+
+    assert client.delete('/delete_user', json={ 'id': user['id'] }).status_code == 200
+
+    # Another worker still has the token verified and has not seen the deletion
+    identity.verified_tokens.update(verified)
+    revocation.cache.clear()
+    revocation.next_refresh = 0
+
+    assert client.get('/get_psychiatric_history', headers=headers).status_code == 401
+    assert client.post('/refresh', headers={ 'Authorization': f"Bearer {user['refresh_token']}" }).status_code == 401
@@ -0,0 +1,26 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore
+
+import passwords
+
+def attempt(password):
+    try:
+        return passwords.hash_password(password)
+    except passwords.HashingBusy:
+        return None
+
+def test_concurrent_hashes_beyond_max_pending_are_turned_away(monkeypatch):
+    # As in a gthread worker with more threads than BCRYPT_MAX_PENDING
+    monkeypatch.setattr(passwords, 'pending', BoundedSemaphore(2))
+    monkeypatch.setattr(passwords, 'log_rounds', 12)
+
+    with ThreadPoolExecutor(max_workers=8) as threads:
+        results = list(threads.map(attempt, [f'password {i}' for i in range(8)]))
+
+    hashed = [result for result in results if result]
+    assert hashed and len(hashed) < len(results)
+    assert passwords.check_password(hashed[0], f'password {results.index(hashed[0])}')
+
+def test_calibration_never_goes_below_the_previous_default_cost():
+    # A target no machine can meet
+    assert passwords.calibrate_log_rounds(0.001) == 12
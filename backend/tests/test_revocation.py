@@ -0,0 +1,32 @@
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+from revocation import LocalRedis, RedisRevocationStore
+
+def revoke_concurrently(store, jti, threads):
+    barrier = Barrier(threads)
+    exp = time.time() + 3600
+
+    def revoke(_):
+        barrier.wait()
+        return store.revoke(jti, exp)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(revoke, range(threads)))
+
+def test_concurrent_revokes_of_one_token_succeed_once():
+    # Switch threads as often as possible so a check-then-write race shows up
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    try:
+        for attempt in range(50):
+            store = RedisRevocationStore(LocalRedis())
+            results = revoke_concurrently(store, f'jti-{attempt}', 16)
+
+            assert results.count(True) == 1
+            assert store.is_revoked(f'jti-{attempt}')
+    finally:
+        sys.setswitchinterval(interval)
@@ -0,0 +1,31 @@
+import uuid
+
+import passwords
+from database import User, db
+
+def test_signin_succeeds_when_rehash_fails(app, client, monkeypatch):
+    email = f'{uuid.uuid4()}@example.com'
+    user = client.post('/signup', json={ 'name': 'Test', 'email': email, 'password': 'password' }).json
+
+    try:
+        # A stored hash below the current cost, so sign in tries to upgrade it
+        with app.app_context():
+            stored = db.session.get(User, user['id'])
+            stored.password = passwords.generate_hash('password', 4)
+            db.session.commit()
+
+        def busy(password):
+            raise passwords.HashingBusy()
+
+        monkeypatch.setattr(passwords, 'log_rounds', 10)
+        monkeypatch.setattr('api.users.hash_password', busy)
+
+        response = client.post('/signin', json={ 'email': email, 'password': 'password' })
+
+        assert response.status_code == 200, response.data
+        assert response.json['access_token']
+
+        with app.app_context():
+            assert db.session.get(User, user['id']).password.startswith('$2b$04$')
+    finally:
+        client.delete('/delete_user', json={ 'id': user['id'] })
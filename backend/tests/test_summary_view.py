@@ -0,0 +1,18 @@
+import pytest
+
+from conftest import PAYLOADS
+
+SUMMARY_FIELDS = {
+    'psychiatric_history': {'id', 'date_created', 'date_last_modified'},
+    'drug_screening_results': {'id', 'date_created', 'date_last_modified'},
+    'relapse_prevention_plan': {'id', 'have_naloxone', 'date_created', 'date_last_modified'}
+}
+
+@pytest.mark.parametrize('form', SUMMARY_FIELDS)
+def test_summary_view_leaves_out_free_text(client, headers, form):
+    assert client.post(f'/add_{form}', json=PAYLOADS[form], headers=headers).status_code == 201
+
+    response = client.get(f'/get_{form}?view=summary', headers=headers)
+
+    assert response.status_code == 200
+    assert [set(record) for record in response.json] == [SUMMARY_FIELDS[form]]
@@ -0,0 +1,43 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from conftest import PAYLOADS
+
+@contextmanager
+def statements_on(app, table):
+    """
+    Collects the SQL statements run against a form table. Statements on other tables, such as the revocation store's
+    refreshes, are left out.
+    """
+    from database import db
+
+    with app.app_context():
+        engine = db.engine
+
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        if table in statement:
+            statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+@pytest.mark.parametrize('form', PAYLOADS)
+def test_add_and_update_run_one_statement(app, client, headers, form):
+    with statements_on(app, form) as statements:
+        response = client.post(f'/add_{form}', json=PAYLOADS[form], headers=headers)
+
+    assert response.status_code == 201, response.data
+    assert len(statements) == 1 and statements[0].startswith('INSERT'), statements
+
+    with statements_on(app, form) as statements:
+        response = client.put(f"/update_{form}/{response.json['id']}", json=PAYLOADS[form], headers=headers)
+
+    assert response.status_code == 200, response.data
+    assert len(statements) == 1 and statements[0].startswith('UPDATE'), statements
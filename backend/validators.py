@@ -0,0 +1,162 @@
+from flask import jsonify, request
+from database import FORM_MODELS
+from sqlalchemy import ARRAY, DATE, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import date, datetime
+from functools import wraps
+
+# Columns set by the server rather than taken from the submitted record
+SERVER_COLUMNS = {'id', 'user_id', 'date_created', 'date_last_modified'}
+
+def is_string(value):
+    return isinstance(value, str)
+
+def is_integer(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def is_date(value):
+    """
+    Whether value is an ISO 8601 date, or a datetime as sent by toISOString(), which Postgres truncates to its date.
+    """
+    if not isinstance(value, str):
+        return False
+
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        try:
+            datetime.fromisoformat(value)
+        except ValueError:
+            return False
+
+    return True
+
+def is_json(value):
+    return isinstance(value, (dict, list))
+
+def is_json_array(value):
+    return isinstance(value, list) and all(isinstance(item, dict) for item in value)
+
+def column_check(column):
+    """
+    The type check and error message for a column, or None for types that aren't checked.
+    """
+    if isinstance(column.type, ARRAY):
+        return is_json_array, 'must be an array of objects'
+    if isinstance(column.type, JSONB):
+        return is_json, 'must be an object or an array'
+    if isinstance(column.type, DATE):
+        return is_date, 'must be an ISO 8601 date'
+    if isinstance(column.type, Integer):
+        return is_integer, 'must be an integer'
+    if isinstance(column.type, String):
+        return is_string, 'must be a string'
+    return None
+
+class Validator:
+    """
+    Checks a submitted record of one form model against the model's columns: NOT NULL columns are required and every
+    value present must match its column's type (strings, ISO dates, JSONB objects/arrays and arrays of objects).
+
+    The columns are read once into a tuple of (name, required, check, message), so validating a record is a single
+    loop of isinstance checks. Keys that aren't form columns are ignored, as the handlers ignore them.
+    """
+    __slots__ = ('columns', 'by_name')
+
+    def __init__(self, model, defaults):
+        columns = []
+
+        for column in model.__table__.columns:
+            if column.name in SERVER_COLUMNS:
+                continue
+
+            required = not column.nullable and not (defaults and column.default is not None)
+            check, message = column_check(column) or (None, None)
+            columns.append((column.name, required, check, message))
+
+        self.columns = tuple(columns)
+        self.by_name = { name: (required, check, message) for name, required, check, message in columns }
+
+    def __call__(self, record):
+        """
+        Returns:
+            - The list of error messages, empty if the record is valid.
+        """
+        if not isinstance(record, dict):
+            return ["Record must be a JSON object"]
+
+        errors = []
+
+        for name, required, check, message in self.columns:
+            value = record.get(name)
+
+            if value is None:
+                if required:
+                    errors.append(f"{name} is required")
+            elif check and not check(value):
+                errors.append(f"{name} {message}")
+
+        return errors
+
+    def partial(self, record):
+        """
+        Validates only the columns present in a partial record, so the cost follows the number of supplied fields.
+        A required column may be left out but can't be set to null.
+        """
+        if not isinstance(record, dict):
+            return ["Record must be a JSON object"]
+
+        errors = []
+
+        for name, value in record.items():
+            column = self.by_name.get(name)
+
+            if column is None:
+                continue
+
+            required, check, message = column
+
+            if value is None:
+                if required:
+                    errors.append(f"{name} cannot be null")
+            elif check and not check(value):
+                errors.append(f"{name} {message}")
+
+        return errors
+
+# Built at import, one validator per form for inserts (where columns with a default may be left out) and one for
+# statements that write every column
+validators = { model: { defaults: Validator(model, defaults) for defaults in (True, False) } for model in FORM_MODELS }
+
+def validate(model, record, defaults=True, partial=False):
+    """
+    Validates a submitted record of a form model.
+
+    Parameters:
+        - defaults: Whether columns with a default may be left out, as insert_record lets them apply. False for
+          update_record and insert_records, which write every column as given.
+        - partial: Whether the record is a partial document, as sent to the PATCH routes, where only the columns
+          present are checked.
+    """
+    validator = validators[model][defaults]
+
+    return validator.partial(record) if partial else validator(record)
+
+def validated(model, defaults=True):
+    """
+    Validates an add_/update_ route's request body before the handler runs and answers invalid records with 422
+    Unprocessable Content, so a malformed request never reaches the database. Goes below @jwt_required().
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            errors = validate(model, request.get_json(), defaults)
+
+            if errors:
+                return jsonify(f"Invalid {model.__table__.name}: {'; '.join(errors)}"), 422
+
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,4 +1,4 @@
-from flask import Flask
+from flask import Flask, jsonify
 from flask_cors import CORS
 from api.users import users_bp
 from api.maternal_demographics import maternal_demo_bp
@@ -11,7 +11,16 @@ from api.infant_information import infant_information_bp
 from api.family_and_supports import family_and_supports_bp
 from api.drug_screening_results import drug_screening_results_bp
 from api.relapse_prevention_plan import relapse_prevention_plan_bp
-from database import db, bcrypt, revoked_tokens
+from api.careplan import careplan_bp
+from api.metrics import metrics_bp
+from database import db, bcrypt
+from identity import verify_identity
+import changes
+import json_provider
+import passwords
+import response_cache
+import revocation
+from importer import careplan_cli
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 import os
@@ -23,24 +32,52 @@ load_dotenv()
 
 def create_app():
     app = Flask(__name__)
+    json_provider.init_app(app)
 
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('SQLALCHEMY_DATABASE_URI')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
+    app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=30)
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
+    app.config['REVOCATION_STORE_URL'] = os.getenv('REVOCATION_STORE_URL', 'postgresql')
+    app.config['REVOCATION_CACHE_SECONDS'] = float(os.getenv('REVOCATION_CACHE_SECONDS', 5))
+    app.config['REVOCATION_REFRESH_SECONDS'] = float(os.getenv('REVOCATION_REFRESH_SECONDS', 1))
+    app.config['REVOCATION_BLOOM_CAPACITY'] = int(os.getenv('REVOCATION_BLOOM_CAPACITY', 10000))
+    app.config['REVOCATION_BLOOM_FALSE_POSITIVE_RATE'] = float(os.getenv('REVOCATION_BLOOM_FALSE_POSITIVE_RATE', 0.001))
+    app.config['BCRYPT_LOG_ROUNDS'] = int(os.getenv('BCRYPT_LOG_ROUNDS', 0))
+    app.config['BCRYPT_TARGET_MS'] = float(os.getenv('BCRYPT_TARGET_MS', 250))
+    app.config['BCRYPT_POOL_SIZE'] = int(os.getenv('BCRYPT_POOL_SIZE', 2))
+    app.config['BCRYPT_MAX_PENDING'] = int(os.getenv('BCRYPT_MAX_PENDING', 8))
+    app.config['RESPONSE_CACHE_SECONDS'] = float(os.getenv('RESPONSE_CACHE_SECONDS', 30))
+    app.config['RESPONSE_CACHE_MAX_BYTES'] = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    app.config['CHANGES_LISTENER'] = os.getenv('CHANGES_LISTENER', 'true') == 'true'
     
     register_blueprints(app)
     db.init_app(app)
     
     migrate = Migrate(app, db)
+    app.cli.add_command(careplan_cli)
 
     CORS(app, supports_credentials=True)
+    passwords.init_app(app)
     bcrypt.init_app(app)
+    revocation.init_app(app)
+    response_cache.init_app(app)
+    changes.init_app(app)
     jwt = JWTManager(app)
 
     @jwt.token_in_blocklist_loader
     def check_if_token_in_blocklist(jwt_header, jwt_payload):
-        return jwt_payload["jti"] in revoked_tokens
+        return revocation.is_token_revoked(jwt_payload)
+
+    # Confirms the token's user exists once per token instead of once per request in every handler
+    @jwt.user_lookup_loader
+    def check_token_identity(jwt_header, jwt_payload):
+        return verify_identity(jwt_payload)
+
+    @jwt.user_lookup_error_loader
+    def user_not_found(jwt_header, jwt_payload):
+        return jsonify("User not found."), 404
     
     return app
 
@@ -56,6 +93,8 @@ def register_blueprints(app):
     app.register_blueprint(drug_screening_results_bp)
     app.register_blueprint(relapse_prevention_plan_bp)
     app.register_blueprint(substance_use_history_bp)
+    app.register_blueprint(careplan_bp)
+    app.register_blueprint(metrics_bp)
 
 def create_all(app):
     with app.app_context():